@@ -1,8 +1,13 @@
 # __init__.py
 from .query import (
+    clear_query_cache,
     InvalidQueryError,
     query,
     Query,
+    query_cache_info,
     search,
+    set_query_cache_size,
 )
-from .decorators import show_stack_values
\ No newline at end of file
+from .decorators import show_stack_values
+from .field import invalidate_schema
+from .indexes import IndexedObject, SearchIndex
\ No newline at end of file
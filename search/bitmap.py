@@ -0,0 +1,52 @@
+# bitmap.py
+#
+# Helpers for position bitmaps.  A bitmap is a python int where bit `i` is set
+# if the element at position `i` of a sequence is a member of the set.  Set
+# operations are performed using the int's bitwise operators, which operate on
+# whole machine words:
+#
+#   union         a | b
+#   intersection  a & b
+#   difference    a & ~b
+
+
+def full(size):
+    '''Returns a bitmap containing every position of a sequence of size'''
+    return (1 << size) - 1
+
+
+def from_positions(positions):
+    '''Returns a bitmap containing positions
+
+    Parameters:
+        positions - an iterable of ints, each int a position
+    '''
+    positions = positions if isinstance(positions, (list, tuple)) \
+        else list(positions)
+    if not positions:
+        return 0
+
+    buffer = bytearray((max(positions) >> 3) + 1)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_positions(bitmap):
+    '''Returns a generator over the positions contained in bitmap, in
+    ascending order
+    '''
+    # Reverse the binary representation so the index of each '1' is its
+    # position, then find each '1' in C rather than testing every bit.
+    bits = bin(bitmap)[:1:-1]
+    find = bits.find
+
+    position = find('1')
+    while position != -1:
+        yield position
+        position = find('1', position + 1)
+
+
+def count(bitmap):
+    '''Returns the number of positions contained in bitmap'''
+    return bin(bitmap).count('1')
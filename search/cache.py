@@ -0,0 +1,106 @@
+# cache.py
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+
+CacheInfo = namedtuple(
+    'CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    '''A bounded, least recently used, cache.  When the cache is full, the
+    least recently used entry is evicted to make room for the new entry.
+
+    Parameters:
+        maxsize - an int representing the maximum number of entries to store.
+            If maxsize is None the cache is unbounded; if maxsize is 0 the
+            cache is disabled and nothing is stored.
+    '''
+    def __init__(self, maxsize=128):
+        self.__lock = Lock()
+        self.__entries = OrderedDict()
+        self.__maxsize = None
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+        self.maxsize = maxsize
+
+    @property
+    def maxsize(self):
+        '''Getter that returns the maximum number of cached entries'''
+        return self.__maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize):
+        '''Setter that updates the maximum number of cached entries.  If the
+        cache currently holds more entries than maxsize, the least recently
+        used entries are evicted.
+        '''
+        assert maxsize is None or (isinstance(maxsize, int) and maxsize >= 0),\
+            f'maxsize must be None or a positive int: actual {maxsize}'
+
+        with self.__lock:
+            self.__maxsize = maxsize
+            self.__evict()
+
+    def get(self, key, default=None):
+        '''Returns the value cached for key, marking it as the most recently
+        used entry.  If key is not cached, default is returned.
+        '''
+        with self.__lock:
+            try:
+                value = self.__entries[key]
+            except KeyError:
+                self.__misses += 1
+                return default
+
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return value
+
+    def put(self, key, value):
+        '''Caches value for key, evicting the least recently used entry if
+        the cache is full.
+        '''
+        with self.__lock:
+            if self.__maxsize == 0:
+                return
+
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            self.__evict()
+
+    def clear(self):
+        '''Removes all cached entries and resets the statistics'''
+        with self.__lock:
+            self.__entries.clear()
+            self.__hits = self.__misses = self.__evictions = 0
+
+    def info(self):
+        '''Returns a CacheInfo containing the cache's statistics'''
+        with self.__lock:
+            return CacheInfo(
+                hits=self.__hits,
+                misses=self.__misses,
+                evictions=self.__evictions,
+                maxsize=self.__maxsize,
+                currsize=len(self.__entries)
+            )
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __evict(self):
+        '''Evicts least recently used entries until the cache is within its
+        bounds.  Note: the caller must hold the lock.
+        '''
+        if self.__maxsize is None:
+            return
+
+        while len(self.__entries) > self.__maxsize:
+            self.__entries.popitem(last=False)
+            self.__evictions += 1
@@ -6,12 +6,18 @@ import logging
 import operator
 from six import with_metaclass
 import re
+import time
 
+from . import bitmap
 from .decorators import stacktrace
 from .field import Field
+from .indexes import SearchIndex
 
 logger = logging.getLogger(__name__)
 
+# Operators which raise TypeError comparing values of unordered types
+ORDERING_OPERATORS = (operator.lt, operator.le, operator.gt, operator.ge)
+
 #################################################
 # Base class
 #################################################
@@ -20,17 +26,103 @@ class Condition(with_metaclass(ABCMeta, object)):
     '''An ABC for all search conditions'''
 
     @abstractmethod
-    def __call__(self, values):
+    def __call__(self, values, candidates):
+        '''Evaluates the condition for the candidate values
+
+        Parameters:
+            values - a sequence of values
+            candidates - a bitmap of the positions, in values, to evaluate.
+                See search.bitmap
+
+        Returns - a bitmap of the positions of the candidates that match the
+            condition
+        '''
         pass
 
     @abstractmethod
     def __str__(self):
         pass
 
+    @abstractmethod
+    def predicate(self):
+        '''Returns a function that takes a single object and returns True if
+        the object matches the condition; otherwise False.  Unlike calling the
+        condition, which evaluates a complete collection of values, the predicate is
+        evaluated one object at a time and short-circuits.
+        '''
+        pass
+
+    def expressions(self):
+        '''Returns a generator over every Expression in the condition tree'''
+        return iter(())
+
+    def estimate(self):
+        '''Returns a tuple of (cost, selectivity) estimating the time to
+        evaluate a single object and the fraction of objects matching the
+        condition, based on the statistics collected by its expressions.
+        Returns None if there are no statistics yet.
+        '''
+        return None
+
+    def may_raise(self):
+        '''Returns True if evaluating the condition may raise an exception,
+        e.g. comparing values of types which are not ordered.  Conditions
+        which may raise are evaluated in their original order, as reordering
+        them changes which values are evaluated, and so whether the query
+        raises.  Unknown conditions may raise.
+        '''
+        return True
+
     def __repr__(self):
         return f'{self.__class__.__name__}: "{self}"'
 
 
+class ExpressionStatistics(object):
+    '''Statistics collected each time an Expression evaluates a set of
+    values.  Statistics are updated without locking, so counts are
+    approximate when an expression is evaluated by multiple threads.
+    '''
+    def __init__(self):
+        self.calls = 0
+        self.evaluated = 0
+        self.matched = 0
+        self.elapsed = 0.0
+
+    def record(self, evaluated, matched, elapsed):
+        '''Records a single evaluation of a set of values
+
+        Parameters:
+            evaluated - the number of values evaluated
+            matched - the number of values that matched
+            elapsed - the time, in seconds, it took to evaluate the values
+        '''
+        self.calls += 1
+        self.evaluated += evaluated
+        self.matched += matched
+        self.elapsed += elapsed
+
+    @property
+    def selectivity(self):
+        '''Getter that returns the fraction of evaluated values that matched,
+        or None if no values have been evaluated
+        '''
+        return self.matched / self.evaluated if self.evaluated else None
+
+    @property
+    def cost(self):
+        '''Getter that returns the average time, in seconds, to evaluate a
+        single value, or None if no values have been evaluated
+        '''
+        return self.elapsed / self.evaluated if self.evaluated else None
+
+    def __str__(self):
+        if not self.evaluated:
+            return 'no statistics'
+        return f'calls={self.calls:,} evaluated={self.evaluated:,} ' \
+            f'selectivity={self.selectivity:.2%} ' \
+            f'cost={self.cost * 1e6:,.3f}us elapsed={self.elapsed:,.4f}s'
+
+
 #################################################
 # Logical Statements
 #
@@ -38,16 +130,37 @@ class Condition(with_metaclass(ABCMeta, object)):
 #################################################
 
 class NotStatement(Condition):
-    '''Logical NOT statement.  This class will NOT a condition, returning a
-    set of items that do not match the condition
+    '''Logical NOT statement.  This class will NOT a condition, returning the
+    candidates that do not match the condition
     '''
     def __init__(self, condition):
         super().__init__()
         self.condition = condition
 
     @stacktrace(logger)
-    def __call__(self, values):
-        return values - self.condition(values)
+    def __call__(self, values, candidates):
+        # Expressions can exclude matching values in a single pass, without
+        # building and subtracting the bitmap of matching values.
+        if isinstance(self.condition, Expression):
+            return self.condition.complement(values, candidates)
+        return candidates & ~self.condition(values, candidates)
+
+    def predicate(self):
+        condition = self.condition.predicate()
+        return lambda value: not condition(value)
+
+    def expressions(self):
+        return self.condition.expressions()
+
+    def may_raise(self):
+        return self.condition.may_raise()
+
+    def estimate(self):
+        estimate = self.condition.estimate()
+        if estimate is None:
+            return None
+        cost, selectivity = estimate
+        return cost, 1 - selectivity
 
     def __str__(self):
         return f'[NOT {self.condition}]'
@@ -55,37 +168,186 @@ class NotStatement(Condition):
 
 class BooleanStatement(Condition):
     '''A boolean statement, base class, designed to be subclassed.
-    A BooleanStatement takes two Condition's and performs a boolean operation
-    on the two resulting sets.
+    A BooleanStatement takes two, or more, Condition's and performs a boolean
+    operation on the resulting bitmaps.
     '''
-    def __init__(self, c1, c2):
+    def __init__(self, *conditions):
         super(BooleanStatement, self).__init__()
 
-        assert isinstance(c1, Condition) and isinstance(c2, Condition)
+        assert len(conditions) >= 2 and \
+            all(isinstance(c, Condition) for c in conditions)
+
+        self.conditions = list(conditions)
+
+    @property
+    def condition1(self):
+        '''Getter that returns the first condition'''
+        return self.conditions[0]
+
+    @property
+    def condition2(self):
+        '''Getter that returns the second condition'''
+        return self.conditions[1]
+
+    def expressions(self):
+        for condition in self.conditions:
+            yield from condition.expressions()
+
+    def may_raise(self):
+        return any(c.may_raise() for c in self.conditions)
+
+    def ordered_conditions(self):
+        '''Returns the conditions ordered so the conditions that are cheapest
+        to evaluate, relative to the number of values they eliminate, are
+        evaluated first.  Conditions without statistics are evaluated last, in
+        their original order.  If any condition may raise, see `may_raise`,
+        the conditions are evaluated in their original order, so the results
+        do not depend on the statistics collected.
+        '''
+        if self.may_raise():
+            return list(self.conditions)
+
+        ranks = []
+        for condition in self.conditions:
+            estimate = condition.estimate()
+            ranks.append(
+                float('inf') if estimate is None else self.rank(*estimate))
+
+        order = sorted(range(len(self.conditions)), key=ranks.__getitem__)
+        return [self.conditions[i] for i in order]
+
+    def estimate(self):
+        '''Estimates the cost and selectivity of evaluating the conditions,
+        in order, where each condition only evaluates the values not already
+        decided by the previous conditions.
+        '''
+        cost = 0.0
+        remaining = 1.0
+
+        for condition in self.ordered_conditions():
+            estimate = condition.estimate()
+            if estimate is None:
+                return None
+
+            condition_cost, selectivity = estimate
+            cost += remaining * condition_cost
+            remaining *= self.remaining(selectivity)
+        return cost, self.selectivity(remaining)
+
+    @staticmethod
+    @abstractmethod
+    def rank(cost, selectivity):
+        '''Returns the rank of a condition, lower ranks are evaluated first'''
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def remaining(selectivity):
+        '''Returns the fraction of values still to be decided after
+        evaluating a condition with the given selectivity
+        '''
+        pass
 
-        self.condition1 = c1
-        self.condition2 = c2
+    @staticmethod
+    @abstractmethod
+    def selectivity(remaining):
+        '''Returns the selectivity of the statement given the fraction of
+        values still undecided after evaluating every condition
+        '''
+        pass
 
     def __str__(self):
-        return f"[{self.condition1} " \
-            f"{self.__class__.__name__.replace('Statement', '').upper()} " \
-            f"{self.condition2}]"
+        operator_name = self.__class__.__name__.replace('Statement', '').upper()
+        return f'[{f" {operator_name} ".join(str(c) for c in self.conditions)}]'
 
 
 class AndStatement(BooleanStatement):
-    '''Logical AND statement.  This class will AND two sets (conditions) together'''
+    '''Logical AND statement.  This class will AND bitmaps (conditions)
+    together.
+
+    Every condition returns the subset of its candidates that matches, so
+    rather than intersecting the results of all conditions, each condition only
+    evaluates the candidates matched by the previous conditions.
+    '''
 
     @stacktrace(logger)
-    def __call__(self, values):
-        return self.condition1(values) & self.condition2(values)
+    def __call__(self, values, candidates):
+        results = candidates
+        for condition in self.ordered_conditions():
+            if not results:
+                break
+            results = condition(values, results)
+        return results
+
+    def predicate(self):
+        conditions = [c.predicate() for c in self.ordered_conditions()]
+
+        def predicate(value):
+            for condition in conditions:
+                if not condition(value):
+                    return False
+            return True
+        return predicate
+
+    # Cheap conditions matching few values are evaluated first.  Only the
+    # values a condition matches are evaluated by the next condition.
+    @staticmethod
+    def rank(cost, selectivity):
+        return cost / (1 - selectivity) if selectivity < 1 else float('inf')
+
+    @staticmethod
+    def remaining(selectivity):
+        return selectivity
+
+    @staticmethod
+    def selectivity(remaining):
+        return remaining
 
 
 class OrStatement(BooleanStatement):
-    '''Logical OR statement.  This class will OR two sets (conditions) together'''
+    '''Logical OR statement.  This class will OR bitmaps (conditions)
+    together.
+
+    Each condition only evaluates the candidates that were not matched by the
+    previous conditions.
+    '''
 
     @stacktrace(logger)
-    def __call__(self, values):
-        return self.condition1(values) | self.condition2(values)
+    def __call__(self, values, candidates):
+        results = 0
+        remaining = candidates
+        for condition in self.ordered_conditions():
+            if not remaining:
+                break
+            matched = condition(values, remaining)
+            if matched:
+                results |= matched
+                remaining &= ~matched
+        return results
+
+    def predicate(self):
+        conditions = [c.predicate() for c in self.ordered_conditions()]
+
+        def predicate(value):
+            for condition in conditions:
+                if condition(value):
+                    return True
+            return False
+        return predicate
+
+    # Cheap conditions matching many values are evaluated first.  Only the
+    # values a condition does not match are evaluated by the next condition.
+    @staticmethod
+    def rank(cost, selectivity):
+        return cost / selectivity if selectivity > 0 else float('inf')
+
+    @staticmethod
+    def remaining(selectivity):
+        return 1 - selectivity
+
+    @staticmethod
+    def selectivity(remaining):
+        return 1 - remaining
 
 
 #################################################
@@ -109,6 +371,7 @@ class Expression(Condition):
         '''
         super(Expression, self).__init__()
         self.field = Field(name, value)
+        self.statistics = ExpressionStatistics()
 
         assert self.__class__.EXPRESSION, \
             f'{self.__class__.__name__} does not implement EXPRESSION'
@@ -116,19 +379,117 @@ class Expression(Condition):
             f'{self.__class__.__name__} does not implement EXPRESSION_NAME'
 
     @stacktrace(logger)
-    def __call__(self, values):
-        '''Returns a set of values which match search criteria
+    def __call__(self, values, candidates):
+        '''Returns a bitmap of the candidates which match search criteria
 
         parameters:
-            values - a list of values to evaluate
-        returns - results subset of values
+            values - a sequence of values
+            candidates - a bitmap of the positions, in values, to evaluate
+        returns - results subset of candidates
         '''
-        results = set()
-        for value in values:
-            if self.field.compare_value(value, self.EXPRESSION):
-                results.add(value)
+        start_time = time.perf_counter()
+
+        matched, unresolved = self.search_index(values, candidates)
+
+        compare_value = self.field.compare_value
+        op_func = self.EXPRESSION
+
+        evaluated = 0
+        results = []
+        for position in bitmap.iter_positions(unresolved):
+            evaluated += 1
+            if compare_value(values[position], op_func):
+                results.append(position)
+        results = matched | bitmap.from_positions(results)
+
+        scanned = evaluated
+        if unresolved != candidates:
+            evaluated = bitmap.count(candidates)
+        self.__record(values, evaluated, bitmap.count(results), scanned,
+            time.perf_counter() - start_time)
         return results
 
+    def complement(self, values, candidates):
+        '''Returns a bitmap of the candidates which do not match the search
+        criteria
+
+        parameters:
+            values - a sequence of values
+            candidates - a bitmap of the positions, in values, to evaluate
+        returns - results subset of candidates
+        '''
+        start_time = time.perf_counter()
+
+        matched, unresolved = self.search_index(values, candidates)
+
+        compare_value = self.field.compare_value
+        op_func = self.EXPRESSION
+
+        evaluated = 0
+        results = []
+        for position in bitmap.iter_positions(unresolved):
+            evaluated += 1
+            if not compare_value(values[position], op_func):
+                results.append(position)
+        results = candidates & ~(matched | unresolved) \
+            | bitmap.from_positions(results)
+
+        scanned = evaluated
+        if unresolved != candidates:
+            evaluated = bitmap.count(candidates)
+        self.__record(values, evaluated, evaluated - bitmap.count(results),
+            scanned, time.perf_counter() - start_time)
+        return results
+
+    def __record(self, values, evaluated, matched, scanned, elapsed):
+        '''Records the statistics of an evaluation, and, if values is a
+        SearchIndex, the workload of its IndexAdvisor
+
+        parameters:
+            evaluated - the number of candidates evaluated
+            matched - the number of candidates that matched
+            scanned - the number of candidates evaluated without an index
+            elapsed - the time, in seconds, the evaluation took
+        '''
+        self.statistics.record(evaluated, matched, elapsed)
+        if isinstance(values, SearchIndex):
+            values.advisor.record(self, scanned, elapsed)
+
+    def search_index(self, values, candidates):
+        '''Resolves the candidates using an index of values, if values is a
+        SearchIndex with an index supporting the expression.
+
+        parameters:
+            values - a sequence of values
+            candidates - a bitmap of the positions, in values, to evaluate
+        returns - a tuple of (matched, unresolved) bitmaps: the candidates
+            matching the expression, and the candidates which must be
+            evaluated.  Without an index every candidate is unresolved.
+        '''
+        if isinstance(values, SearchIndex):
+            resolved = values.search(self, candidates)
+            if resolved is not None:
+                return resolved
+        return 0, candidates
+
+    def predicate(self):
+        compare_value = self.field.compare_value
+        op_func = self.EXPRESSION
+        return lambda value: bool(compare_value(value, op_func))
+
+    def expressions(self):
+        yield self
+
+    def may_raise(self):
+        # Ordering comparisons raise TypeError for values of types which are
+        # not ordered, e.g. a str and a float
+        return self.EXPRESSION in ORDERING_OPERATORS
+
+    def estimate(self):
+        if not self.statistics.evaluated:
+            return None
+        return self.statistics.cost, self.statistics.selectivity
+
     def __str__(self):
         return f'({self.field.name} {self.__class__.EXPRESSION_NAME} ' \
             f'{self.field.value})'
@@ -215,6 +576,11 @@ class LikeExpression(Expression):
         return value and re.search(value, str(name)) is not None
     EXPRESSION = operator_like
 
+    def may_raise(self):
+        # The query value, converted to the type of the matching value, may
+        # not be a valid regular expression
+        return True
+
 
 class NotEqualExpression(Expression):
     '''Inequality expression that validates any element whose name is a
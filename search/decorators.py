@@ -3,6 +3,8 @@ from datetime import datetime
 from functools import wraps
 import time
 
+from .bitmap import iter_positions
+
 
 STACKDEPTH = 0
 
@@ -26,7 +28,7 @@ def stacktrace(logger):
     exits.  The output will be indented based on the depth of the stack.
     '''
     def decorator(func):
-        def print_stack(self, values, *args, **kwargs):
+        def print_stack(self, values, candidates, *args, **kwargs):
             global STACKDEPTH, PRINT_STACK_VALUES
             
             results = None
@@ -41,10 +43,10 @@ def stacktrace(logger):
                 if PRINT_STACK_VALUES:
                     padding = ' ' * (4 * STACKDEPTH)
                     logger.debug(f'{padding}Input set:')
-                    for result in values:
-                        logger.debug(f"{padding}- {result}")
+                    for position in iter_positions(candidates):
+                        logger.debug(f"{padding}- {values[position]}")
 
-                results = func(self, values, *args, **kwargs)
+                results = func(self, values, candidates, *args, **kwargs)
                 return results
             finally:
                 padding = f"{' ' * (4 * STACKDEPTH)}"
@@ -53,8 +55,8 @@ def stacktrace(logger):
                     if not results:
                         logger.debug(f"{padding}* No Results *")
                     else:
-                        for result in results:
-                            logger.debug(f"{padding}+ {result}")
+                        for position in iter_positions(results):
+                            logger.debug(f"{padding}+ {values[position]}")
                     logger.debug(f"{padding}Elapse time: {time.time() - start_time:,.4f}")
 
                 STACKDEPTH -= 1
@@ -1,13 +1,242 @@
 # fields.py
+from collections.abc import Mapping
 from datetime import date, datetime
 import logging
+from operator import attrgetter
 import re
+import weakref
 
 from .exceptions import InvalidQueryError
+from . import parsers
 from .parsers import register_parser, PARSERS
 
 logger = logging.getLogger(__name__)
 
+# The maximum number of regular expressions, and attribute names per regular
+# expression, whose match results are cached by a Schema.  Bounds the memory
+# used by types, such as dict, whose attribute names are not fixed.
+MAX_CACHED_NAMES = 1024
+
+# Returned by accessors when an object has no attribute of the given name
+MISSING = object()
+
+# Schemas keyed by the id of their class.  Entries are removed when the class
+# is garbage collected.
+_schemas = {}
+
+
+def literal_name(pattern):
+    '''Returns a tuple of (literal, exact) if the regular expression pattern
+    matches a literal attribute name; otherwise (None, False).  exact is True
+    if pattern is anchored, '^name$', and only matches the literal name.
+    Patterns that are not anchored match any name containing the literal.
+
+    Parameters:
+        pattern - a regular expression, as a string
+    '''
+    exact = len(pattern) > 2 and pattern[0] == '^' and pattern[-1] == '$'
+    name = pattern[1:-1] if exact else pattern
+
+    if not name or re.escape(name) != name:
+        return None, False
+    return name, exact
+
+
+class NameMatches(dict):
+    '''A dict of attribute name to a bool indicating whether the name matches
+    regex.  Names are matched, and cached, the first time they are looked up.
+
+    Parameters:
+        regex - a compiled regular expression
+        properties - the property names of a class, of which the names
+            matching regex are stored in the `properties` attribute
+        slots - the slot, or field, names of a class, of which the names
+            matching regex are stored in the `slots` attribute
+    '''
+    def __init__(self, regex, properties=(), slots=()):
+        super(NameMatches, self).__init__()
+        self.regex = regex
+        self.literal, self.exact = literal_name(regex.pattern)
+        self.positives = set()
+        self.properties = tuple(name for name in properties if self[name])
+        self.slots = tuple(name for name in slots if self[name])
+
+    def __missing__(self, name):
+        matched = self.regex.search(name) is not None
+        if len(self) < MAX_CACHED_NAMES:
+            self[name] = matched
+            if matched:
+                self.positives.add(name)
+        return matched
+
+    def excludes(self, names):
+        '''Returns True if none of names match regex, determined without
+        testing each name individually; otherwise False, in which case names
+        may, or may not, match.
+
+        Parameters:
+            names - a set like view of names, e.g. dict.keys()
+        '''
+        return self.positives.isdisjoint(names) and names <= self.keys()
+
+
+class Schema(object):
+    '''The searchable attributes of a class: the names of the class's
+    properties, slots and namedtuple fields and, for each attribute name
+    regular expression, which attribute names match.
+
+    Parameters:
+        cls - the class
+    '''
+    def __init__(self, cls):
+        attributes = vars(cls)
+
+        self.size = len(attributes)
+        self.is_mapping = issubclass(cls, Mapping)
+        self.is_list = issubclass(cls, list)
+        self.__property_names = tuple(
+            k for k, v in attributes.items() if type(v) is property)
+        self.properties = frozenset(self.__property_names)
+
+        # Instances of classes defining __slots__, without a base class that
+        # does not, have no __dict__
+        self.has_dict = any('__dict__' in vars(c) for c in cls.__mro__)
+
+        # Public attributes not stored in the instance's __dict__: the fields
+        # of a namedtuple, followed by the slots of every class in the MRO
+        slots = list(getattr(cls, '_fields', ())) \
+            if issubclass(cls, tuple) else []
+        for c in reversed(cls.__mro__):
+            names = vars(c).get('__slots__', ())
+            for name in (names,) if isinstance(names, str) else names:
+                if not name.startswith('_') and name not in slots:
+                    slots.append(name)
+        self.slots = tuple(slots)
+
+        self.__matches = {}
+        self.__accessors = {}
+
+    def matches(self, regex):
+        '''Returns the NameMatches, for regex, of the class's attribute names
+
+        Parameters:
+            regex - a compiled regular expression
+        '''
+        try:
+            return self.__matches[regex]
+        except KeyError:
+            pass
+
+        # Bound the number of cached regular expressions
+        if len(self.__matches) >= MAX_CACHED_NAMES:
+            self.__matches.clear()
+
+        matches = self.__matches[regex] = \
+            NameMatches(regex, self.__property_names, self.slots)
+        return matches
+
+    def accessor(self, name):
+        '''Returns a function which takes an instance of the class and
+        returns the value of its attribute named exactly name, or MISSING if
+        it has no such attribute.  Returns None if attributes of the class
+        cannot be accessed by name.
+
+        Parameters:
+            name - the attribute name
+        '''
+        try:
+            return self.__accessors[name]
+        except KeyError:
+            pass
+
+        if self.is_mapping:
+            def accessor(obj):
+                return obj.get(name, MISSING)
+        elif self.is_list:
+            accessor = None
+        elif name in self.properties:
+            accessor = attrgetter(name)
+        elif name in self.slots:
+            # Unset slots raise AttributeError
+            def accessor(obj):
+                return getattr(obj, name, MISSING)
+        elif name.startswith('_') or not self.has_dict:
+            def accessor(obj):
+                return MISSING
+        else:
+            def accessor(obj):
+                return obj.__dict__.get(name, MISSING)
+
+        # Bound the number of cached accessors
+        if len(self.__accessors) >= MAX_CACHED_NAMES:
+            self.__accessors.clear()
+
+        self.__accessors[name] = accessor
+        return accessor
+
+
+def get_schema(cls):
+    '''Returns the Schema for cls.  Schemas are cached per class and rebuilt
+    when attributes are added to, or removed from, the class.  As the schema
+    is looked up for every object searched, attributes replaced in place are
+    not detected, see `invalidate_schema`.
+
+    Parameters:
+        cls - the class
+    '''
+    key = id(cls)
+    schema = _schemas.get(key)
+    if schema is None or schema.size != len(cls.__dict__):
+        schema = Schema(cls)
+
+        # Remove the schema when the class is garbage collected, before its
+        # id can be reused
+        schema.ref = weakref.ref(cls, lambda _: _schemas.pop(key, None))
+        _schemas[key] = schema
+    return schema
+
+
+def invalidate_schema(cls):
+    '''Discards the cached Schema of cls, so it is rebuilt the next time it
+    is used.  Required after replacing an attribute of cls by a property, or
+    a property by an attribute which is not a property, without adding or
+    removing attributes.  Replacing a property by another property does not
+    require the schema to be rebuilt.
+
+    Parameters:
+        cls - the class
+    '''
+    _schemas.pop(id(cls), None)
+
+
+def get_attributes(obj):
+    '''Returns a list of (name, value) tuples of every attribute of obj which
+    field names are matched against: the items of a Mapping, the indexes of a
+    list, as strings, or the public attributes, set slots and properties of
+    any other object.  Properties are evaluated.
+
+    Parameters:
+        obj - the object whose attributes to return
+    '''
+    schema = get_schema(obj.__class__)
+    if schema.is_mapping:
+        return list(obj.items())
+    if schema.is_list:
+        return [(str(k), v) for k, v in enumerate(obj)]
+
+    attributes = []
+    if schema.has_dict:
+        attributes.extend((k, v) for k, v in obj.__dict__.items()
+            if not k.startswith('_') and k not in schema.properties)
+
+    for name in schema.slots:
+        value = getattr(obj, name, MISSING)
+        if value is not MISSING:
+            attributes.append((name, value))
+
+    attributes.extend((k, getattr(obj, k)) for k in schema.properties)
+    return attributes
+
 
 class Field(object):
     '''Represents a field, containing a name and a value, to be used for
@@ -31,6 +260,18 @@ class Field(object):
         self.__name_attr_regex = self.compile_regex(self.name)
         self.__org_name_attr_regex = self.compile_regex(self.original_name)
 
+        # The chain of nested Fields, from this Field to the parent of the
+        # innermost, leaf, Field.  Empty if the Field is not nested.
+        self.__path = []
+        self.__leaf = self
+        while self.__leaf.is_nested_type:
+            self.__path.append(self.__leaf)
+            self.__leaf = self.__leaf.value
+
+        # Query values converted to the type of attribute values, see
+        # __convert
+        self.__conversions = {}
+
     @staticmethod
     def compile_regex(regex_str):
         try:
@@ -65,49 +306,62 @@ class Field(object):
             value to this Field object's value attribute.  Otherwise False.
         '''
 
-        # Create a dict of params to pass to __compare_value_helper.
-        # This is to allow us to call __compare_value_helper only once
-        # but change the parameters if the object is nested or not.
-        params = dict(
-            obj=obj,
-            op_func=op_func,
-            regex=self.__name_attr_regex,
-            value=self.value
-        )
+        if not self.__path:
+            return self.__compare_value_helper(
+                obj, self.__name_attr_regex, self.value, op_func)
+
+        # There are two paths for nested type:
+        # 1) look for child objects matching the child attrs, one level at a
+        #    time.  Literal names are resolved by accessors cached per type,
+        #    see Schema.accessor
+        # 2) look for attributes whose names are in the format foo.bar,
+        #    starting at the deepest level reached by 1)
+        objects = []
+        for field in self.__path:
+            objects.append(obj)
+            obj = field.lookup(obj)
+            if not obj:
+                break
+        else:
+            if self.__leaf.compare_value(obj, op_func):
+                return True
 
-        if self.is_nested_type:
-            # There are two paths for nested type:
-            # 1) look for child objects matching the child attrs - recursively
-            # 2) look for attributes whose names are in the format foo.bar
+        for field, obj in zip(reversed(self.__path[:len(objects)]),
+                reversed(objects)):
+            if field.__compare_value_helper(obj, field.__org_name_attr_regex,
+                    field.original_value, op_func):
+                return True
+        return False
 
-            _, matching_value = self.__is_matching_attr_name(
-                obj,
-                self.__name_attr_regex
-            )
+    def lookup(self, obj):
+        '''Returns the value of the first attribute of obj whose name matches
+        the Field's name, or False if obj has no matching attribute.  Note:
+        nested fields are not resolved, use `compare_value` for nested fields.
 
-            # If a matching value is found, recursively test the matching
-            # value against the sub-field (as self.value).
-            if matching_value and \
-                    self.value.compare_value(matching_value, op_func):
-                return True
+        Parameters:
+            obj - the object whose attributes to search
+        '''
+        _, matching_value = self.__is_matching_attr_name(
+            obj,
+            self.__name_attr_regex
+        )
+        return matching_value
 
-            # If no match was found, compare obj against the original name
-            params['regex'] = self.__org_name_attr_regex
-            params['value'] = self.original_value
+    def convert(self, _type):
+        '''Returns the Field's value converted to _type, or None if the value
+        cannot be converted.
 
-        return self.__compare_value_helper(**params)
+        Parameters:
+            _type - the type to convert the Field's value to
+        '''
+        return self.__convert(_type, self.value)
 
     def __str__(self):
         '''Returns a string representation of the object'''
         return f'Field[name={self.name}, value={self.value}]'
 
-    ###########################################################################
-    # Class Methods
-    ###########################################################################
-
-    @classmethod
-    def __compare_value_helper(cls, obj, regex, value, op_func):
-        '''Helper class method used for comparing a value
+    def __compare_value_helper(self, obj, regex, value, op_func):
+        '''Helper method used for comparing a value
 
         Parameters:
             obj - the object to compare
@@ -120,7 +374,7 @@ class Field(object):
             and op_func returns True when comparing the matching attribute
             value to this Field object's value attribute.  Otherwise False.
         '''
-        _, matching_value = cls.__is_matching_attr_name(obj, regex)
+        _, matching_value = self.__is_matching_attr_name(obj, regex)
 
         # If the obj has a matching name or the value is a special case
         #
@@ -134,10 +388,30 @@ class Field(object):
 
             return op_func(
                 matching_value, 
-                cls.__convert_type(type(matching_value), value)
+                self.__convert(type(matching_value), value)
             )
         return False
 
+    def __convert(self, _type, value):
+        '''Returns value converted to _type, or None if value cannot be
+        converted.  Conversions, including failed conversions, are cached so
+        value is converted once per type.  Conversions by PARSERS are cached
+        per year, as dates without a year default to the current year.
+
+        Parameters:
+            _type - the type to convert 'value' to
+            value - the value, as a string, to convert
+        '''
+        key = (_type, value, parsers.current_year()) if _type in PARSERS \
+            else (_type, value)
+        try:
+            return self.__conversions[key]
+        except KeyError:
+            pass
+
+        converted = self.__conversions[key] = self.__convert_type(_type, value)
+        return converted
+
     ###########################################################################
     # Static Methods
     ###########################################################################
@@ -174,10 +448,12 @@ class Field(object):
     @staticmethod
     def __is_matching_attr_name(other, regex):
         '''This method determines if 'other' contains an attribute that matches
-        regex. This method will first extract all public attributes and 
-        properties from the 'other' object, then compares the attributes names
-        to regex using a precompiled regular expression.  If an attribute
-        is a match the attributes value is returned to the caller.
+        regex. This method compares the names of all public attributes and
+        properties of the 'other' object to regex using a precompiled regular
+        expression.  If an attribute is a match the attributes value is
+        returned to the caller.  Properties are only evaluated if their name
+        is a match.  If regex is a literal name, an attribute with exactly
+        that name is a match before any other attribute.
 
         Parameters
             other - the object to compare_value
@@ -189,23 +465,58 @@ class Field(object):
         # Get all the attributes.
         # Note: We are _not_ using `inspect` for better performance.
         try:
-            attributes = {
-                k:v for k, v in other.__dict__.items() if not k.startswith('_')
-            } if not isinstance(other, dict) else other
-
-            # If value is not a dict, update property_attributes
-            if not isinstance(other, dict):
-                attributes.update({
-                    k: getattr(other, k)
-                    for k, v in other.__class__.__dict__.items()
-                    if type(v) is property
-                })
+            schema = get_schema(other.__class__)
+            matches = schema.matches(regex)
+
+            # Literal names are first resolved directly.  If there is no
+            # attribute with exactly that name, search for attribute names
+            # containing the literal, unless the name is anchored.
+            literal = matches.literal
+            if literal is not None:
+                accessor = schema.accessor(literal)
+                if accessor is not None:
+                    value = accessor(other)
+                    if value is not MISSING:
+                        return literal, value
+                    if matches.exact:
+                        return False, False
+
+            # Mappings are searched by key and lists by index.  Names which
+            # are known not to match are not searched.
+            if schema.is_mapping:
+                if matches.excludes(other.keys()):
+                    return False, False
+                attributes = other.items()
+            elif schema.is_list:
+                attributes = ((str(k), v) for k, v in enumerate(other))
+            else:
+                # Search the public attributes, then the slots, then the
+                # properties.  A property shadows an attribute of the same
+                # name.  Only the first matching property is evaluated.
+                if schema.has_dict:
+                    attributes = other.__dict__
+                    if not matches.excludes(attributes.keys()):
+                        for attr_name, attr_value in attributes.items():
+                            if matches[attr_name] and \
+                                    not attr_name.startswith('_'):
+                                if attr_name in schema.properties:
+                                    attr_value = getattr(other, attr_name)
+                                return attr_name, attr_value
+
+                for attr_name in matches.slots:
+                    attr_value = getattr(other, attr_name, MISSING)
+                    if attr_value is not MISSING:
+                        return attr_name, attr_value
+
+                for attr_name in matches.properties:
+                    return attr_name, getattr(other, attr_name)
+                return False, False
 
             # Iterate through all attributes from obj and verify if an
             # attribute matches the fields name or fully qualified name (in
             # the case were the two are different).
-            for attr_name, attr_value in attributes.items():
-                if regex.search(attr_name):
+            for attr_name, attr_value in attributes:
+                if matches[attr_name]:
                     return attr_name, attr_value
         except AttributeError:
             pass
@@ -0,0 +1,579 @@
+# __init__.py
+#
+# Indexes over the values of a collection, used by the tree execution engine
+# to resolve expressions without evaluating every value.  See SearchIndex.
+
+from abc import ABCMeta, abstractmethod
+from array import array
+from collections.abc import Sequence
+from six import with_metaclass
+import weakref
+
+from .. import bitmap
+from ..field import Field, get_schema
+
+# Index types by name, see register_index
+INDEX_TYPES = {}
+DEFAULT_INDEX_TYPE = 'hash'
+
+# Stored by indexes for the positions whose value is not indexed
+NOT_INDEXED = object()
+
+# The version of the state saved by SearchIndex.save
+STORAGE_VERSION = 1
+
+
+def register_index(name):
+    '''Decorator that registers an Index class as the index type name'''
+    def decorator(cls):
+        INDEX_TYPES[name] = cls
+        return cls
+
+    return decorator
+
+
+def is_comparable(value):
+    '''Returns True if expressions compare value, the value of a matching
+    attribute; otherwise False.  Falsy values are never compared, except None
+    and the empty string, see `Field.compare_value`.
+    '''
+    return bool(value) or value is None or value == ''
+
+
+def is_special_match(key, value):
+    '''Returns True if the query value, a string, matches attribute values
+    equal to the falsy key; otherwise False.  None is only matched by 'None'
+    and '.*', and the empty string by '' and '.*'.
+    '''
+    if key is None:
+        return value in ('None', '.*')
+    return value in ('', '.*')
+
+
+def postings(positions):
+    '''Returns positions in their most compact form: a single position as
+    its complement, a negative int, a bitmap if the positions are dense, at
+    least one in 64, otherwise an array of int64.
+
+    Parameters:
+        positions - a list of ints, each int a position, in ascending order
+    '''
+    if len(positions) == 1:
+        return ~positions[0]
+    if positions and len(positions) * 64 > positions[-1]:
+        return bitmap.from_positions(positions)
+    return array('q', positions)
+
+
+def is_bitmap(postings):
+    '''Returns True if postings, as created by `postings`, is a bitmap'''
+    return isinstance(postings, int) and postings >= 0
+
+
+def to_bitmap(postings):
+    '''Returns postings, as created by `postings`, as a bitmap'''
+    if is_bitmap(postings):
+        return postings
+    if isinstance(postings, int):
+        return 1 << ~postings
+    return bitmap.from_positions(postings.tolist())
+
+
+def to_array(postings):
+    '''Returns postings, as created by `postings`, which are not a bitmap,
+    as a modifiable array.  Arrays loaded from a file are read only
+    memoryviews, see `SearchIndex.load`.
+    '''
+    if isinstance(postings, int):
+        return array('q', [~postings])
+    if isinstance(postings, memoryview):
+        return array('q', postings)
+    return postings
+
+
+def add_position(postings, position):
+    '''Returns postings, as created by `postings`, including position.
+    Arrays are modified in place; positions added to an array are not sorted.
+    '''
+    if is_bitmap(postings):
+        return postings | 1 << position
+    postings = to_array(postings)
+    postings.append(position)
+    return postings
+
+
+def remove_position(postings, position):
+    '''Returns postings, as created by `postings`, excluding position, which
+    postings must contain.  Arrays are modified in place.
+    '''
+    if is_bitmap(postings):
+        return postings & ~(1 << position)
+    postings = to_array(postings)
+    postings.remove(position)
+    return postings
+
+
+def iter_postings(postings):
+    '''Returns an iterator over the positions of postings, as created by
+    `postings`
+    '''
+    if is_bitmap(postings):
+        return bitmap.iter_positions(postings)
+    if isinstance(postings, int):
+        return iter((~postings,))
+    return iter(postings)
+
+
+def estimate_distinct(sample, count):
+    '''Returns an estimate of the number of distinct values of count values,
+    from a list of a sample of the values.  The fraction of the sample which
+    is distinct is assumed to hold for every value, which overestimates
+    values with few distinct values.
+    '''
+    if not sample:
+        return 0
+
+    distinct = set()
+    unhashable = 0
+    for value in sample:
+        try:
+            distinct.add(value)
+        except TypeError:
+            unhashable += 1
+    return min(count, -(-count * (len(distinct) + unhashable) // len(sample)))
+
+
+def position_list(items):
+    '''Returns a list of the item stored for each position, NOT_INDEXED if
+    none is, from items, a dict of each position to its item
+    '''
+    results = [NOT_INDEXED] * (max(items) + 1 if items else 0)
+    for position, item in items.items():
+        results[position] = item
+    return results
+
+
+def set_position(items, position, item):
+    '''Sets the item stored for position in the list items, see
+    `position_list`, extending the list if required
+    '''
+    if position >= len(items):
+        items.extend([NOT_INDEXED] * (position - len(items)))
+        items.append(item)
+    else:
+        items[position] = item
+
+
+def pop_position(items, position):
+    '''Returns, and clears, the item stored for position in the list items,
+    see `position_list`.  The list is shortened if position is its last.
+    '''
+    if position >= len(items):
+        return NOT_INDEXED
+    if position == len(items) - 1:
+        return items.pop()
+    item = items[position]
+    items[position] = NOT_INDEXED
+    return item
+
+
+class Index(with_metaclass(ABCMeta, object)):
+    '''An ABC for indexes over the values of a collection.  Indexes are built
+    once, then kept up to date, by SearchIndex, as values are added, removed
+    and updated, see `insert` and `remove`.
+    '''
+    OPERATORS = ()  # the EXPRESSION_NAMEs of the expressions resolved
+
+    # What is indexed at each position, see `_get_indexed`
+    _indexed = None
+
+    def supports(self, expression):
+        '''Returns True if the index can resolve expression; otherwise False'''
+        return expression.EXPRESSION_NAME in self.OPERATORS
+
+    @abstractmethod
+    def search(self, expression, candidates):
+        '''Resolves expression for the candidate positions
+
+        Parameters:
+            expression - an Expression supported by the index
+            candidates - a bitmap of the positions to evaluate
+
+        Returns - a tuple of (matched, unresolved) bitmaps: the candidates
+            matching expression, and the candidates the index could not
+            resolve, which must be evaluated by the expression itself
+        '''
+        pass
+
+    @abstractmethod
+    def insert(self, position, obj):
+        '''Indexes obj at position, which is either a position not currently
+        indexed, see `remove`, or the position after the last position.
+        What is indexed at each position is stored to remove it, see
+        `_get_indexed`, but is only created, from the postings, by the first
+        change, so it is not built by read only SearchIndexes, nor saved.
+        '''
+        pass
+
+    @abstractmethod
+    def remove(self, position):
+        '''Removes the value indexed at position, leaving the position
+        unindexed until a value is inserted at it
+        '''
+        pass
+
+    def _get_indexed(self):
+        '''Returns a list of what is indexed at each position, see
+        `position_list`, which `insert` and `remove` maintain.  The list is
+        created, from the postings, by the first change, see `_invert`.
+        '''
+        if self._indexed is None:
+            self._indexed = position_list(self._invert())
+        return self._indexed
+
+    def _invert(self):
+        '''Returns a dict of each indexed position to what is indexed at it,
+        created from the postings.  Unresolved positions are mapped to None,
+        as what is indexed is not needed to remove them.  Implemented by
+        indexes which use `_get_indexed`.
+        '''
+        raise NotImplementedError
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_indexed', None)
+        return state
+
+
+class FieldIndex(Index):
+    '''An ABC for indexes over the values of a single field.  The value of
+    each object is the value the field's expressions compare, see
+    `Field.lookup`.
+
+    Parameters:
+        name - the field name, a regular expression.  Nested field names are
+            not supported.
+        values - the sequence of values to index
+    '''
+    # Estimates of the memory, in bytes, used for each value and for each
+    # distinct value indexed, see `estimate_size`
+    BYTES_PER_VALUE = 8
+    BYTES_PER_KEY = 0
+
+    def __init__(self, name, values):
+        self.name = name
+        self.field = Field(name, '')
+
+        assert not self.field.is_nested_type, \
+            f'nested fields can not be indexed: {name!r}'
+
+    @classmethod
+    def estimate_size(cls, sample, count):
+        '''Returns an estimate of the memory, in bytes, used by an index of
+        count values
+
+        Parameters:
+            sample - a list of a sample of the values, see `is_comparable`
+            count - the number of values indexed
+        '''
+        distinct = estimate_distinct(sample, count)
+        return int(count * cls.BYTES_PER_VALUE + distinct * cls.BYTES_PER_KEY)
+
+    def __getstate__(self):
+        state = super(FieldIndex, self).__getstate__()
+        del state['field']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.field = Field(self.name, '')
+
+    def __str__(self):
+        return f'{self.__class__.__name__}[name={self.name}]'
+    __repr__ = __str__
+
+
+class SearchIndex(Sequence):
+    '''A sequence of values, and indexes over their values, which queries
+    evaluated by the tree engine use to resolve expressions instead of
+    evaluating every value.  Values are copied, so the sequence passed in may
+    be modified without affecting the SearchIndex.
+
+    Values are added, removed and updated using `add`, `remove` and `update`,
+    which keep every index up to date without rebuilding it.  Values are
+    compared by identity, and must be distinct to be removed or updated.
+    Values which are IndexedObjects are updated whenever their attributes are
+    set.  The field names and operators of the queries executed are recorded
+    by `advisor`, an IndexAdvisor, which recommends the indexes to create.
+
+    Parameters:
+        values - an iterable of values
+        fields - the field names to create an index of the default index
+            type for, see `create_index`
+        names - a bool indicating whether to create an index of attribute
+            names, see `create_name_index`
+    '''
+    def __init__(self, values, fields=(), names=False):
+        self.__values = list(values)
+        self.__indexes = {}
+        self.__name_index = None
+        # The position of each value by id, created by the first change
+        self.__positions = None
+        # Records the workload of queries, and recommends indexes
+        self.advisor = IndexAdvisor(self)
+
+        for value in self.__values:
+            if isinstance(value, IndexedObject):
+                value._add_search_index(self)
+
+        for name in fields:
+            self.create_index(name)
+        if names:
+            self.create_name_index()
+
+    def add(self, value):
+        '''Appends value, and adds it to every index
+
+        Parameters:
+            value - the value to add, which must not already be present
+        '''
+        positions = self.__get_positions()
+        assert id(value) not in positions, f'value already added: {value!r}'
+
+        position = len(self.__values)
+        self.__values.append(value)
+        positions[id(value)] = position
+        for index in self.indexes:
+            index.insert(position, value)
+
+        if isinstance(value, IndexedObject):
+            value._add_search_index(self)
+
+    def remove(self, value):
+        '''Removes value, and removes it from every index.  The last value is
+        moved to the position of value, so the order of the values is not
+        preserved.  Raises ValueError if value is not present.
+        '''
+        positions = self.__get_positions()
+        position = positions.pop(id(value), None)
+        if position is None:
+            raise ValueError(f'value not in SearchIndex: {value!r}')
+
+        last = len(self.__values) - 1
+        indexes = self.indexes
+        for index in indexes:
+            index.remove(position)
+
+        if position != last:
+            moved = self.__values[last]
+            self.__values[position] = moved
+            positions[id(moved)] = position
+            for index in indexes:
+                index.remove(last)
+                index.insert(position, moved)
+        self.__values.pop()
+
+        if isinstance(value, IndexedObject):
+            value._remove_search_index(self)
+
+    def update(self, value):
+        '''Updates every index with the current attributes of value, which must
+        be called after value is modified.  Raises ValueError if value is not
+        present.
+        '''
+        position = self.__get_positions().get(id(value))
+        if position is None:
+            raise ValueError(f'value not in SearchIndex: {value!r}')
+
+        for index in self.indexes:
+            index.remove(position)
+            index.insert(position, value)
+
+    def save(self, path):
+        '''Saves the indexes, but not the values, to the file path, from
+        which they are loaded by `load`
+
+        Parameters:
+            path - the path of the file to create, or replace
+        '''
+        storage.save(dict(
+            version=STORAGE_VERSION,
+            size=len(self.__values),
+            indexes=self.__indexes,
+            name_index=self.__name_index,
+        ), path)
+
+    @classmethod
+    def load(cls, path, values):
+        '''Returns a SearchIndex of values, using the indexes saved to the file
+        path by `save`, rather than building them.  The file is memory mapped,
+        so postings are read from the file, and must not be modified while
+        the SearchIndex is in use.  Only load files from trusted sources.
+
+        Parameters:
+            path - the path of a file created by `save`
+            values - an iterable of the values, in the same order, and with
+                the same attributes, as the values of the saved SearchIndex
+
+        Returns - a SearchIndex
+        '''
+        state = storage.load(path)
+        if not isinstance(state, dict) \
+                or state.get('version') != STORAGE_VERSION:
+            raise ValueError(f'unsupported search index file: {path!r}')
+
+        search_index = cls(values)
+        assert len(search_index) == state['size'], \
+            f'values must be the {state["size"]} values saved: ' \
+            f'actual {len(search_index)}'
+
+        search_index.__indexes = state['indexes']
+        search_index.__name_index = state['name_index']
+        return search_index
+
+    def __get_positions(self):
+        '''Returns the position of each value by id, see `add`'''
+        if self.__positions is None:
+            positions = {id(value): position
+                for position, value in enumerate(self.__values)}
+            assert len(positions) == len(self.__values), \
+                'values must be distinct to be added, removed or updated'
+            self.__positions = positions
+        return self.__positions
+
+    def create_index(self, name, kind=DEFAULT_INDEX_TYPE):
+        '''Creates, and returns, an index over the values of the field name.
+        An existing index of the same field and kind is replaced.
+
+        Parameters:
+            name - the field name, as used in query strings
+            kind - the type of index, one of INDEX_TYPES
+        '''
+        assert kind in INDEX_TYPES, \
+            f'kind must be one of {tuple(INDEX_TYPES)}: actual {kind!r}'
+
+        index = INDEX_TYPES[kind](name, self.__values)
+        indexes = self.__indexes.setdefault(name, {})
+        indexes[kind] = index
+        return index
+
+    def drop_index(self, name, kind=None):
+        '''Removes the indexes of the field name; only the index of type kind
+        if kind is not None.
+        '''
+        indexes = self.__indexes.get(name, {})
+        for _kind in ([kind] if kind else list(indexes)):
+            indexes.pop(_kind, None)
+        if not indexes:
+            self.__indexes.pop(name, None)
+
+    def create_name_index(self):
+        '''Creates, and returns, an index of the attribute names of every
+        value, which resolves bare name queries, e.g. `fo0d`, and limits the
+        values evaluated by other expressions to those having an attribute
+        whose name matches.  An existing name index is replaced.
+        '''
+        self.__name_index = NameIndex(self.__values)
+        return self.__name_index
+
+    def drop_name_index(self):
+        '''Removes the index of attribute names'''
+        self.__name_index = None
+
+    @property
+    def indexes(self):
+        '''Getter that returns a list of every index'''
+        indexes = [i for indexes in self.__indexes.values()
+            for i in indexes.values()]
+        if self.__name_index is not None:
+            indexes.append(self.__name_index)
+        return indexes
+
+    def search(self, expression, candidates):
+        '''Resolves expression for the candidate positions using the first
+        index of the expression's field supporting it, otherwise the index of
+        attribute names.
+
+        Parameters:
+            expression - the Expression to resolve
+            candidates - a bitmap of the positions to evaluate
+
+        Returns - a tuple of (matched, unresolved) bitmaps, see
+            `Index.search`, or None if no index supports expression
+        '''
+        field = expression.field
+        if field.is_nested_type:
+            return None
+
+        for index in self.__indexes.get(field.name, {}).values():
+            if index.supports(expression):
+                return index.search(expression, candidates)
+
+        if self.__name_index is not None:
+            return self.__name_index.search(expression, candidates)
+        return None
+
+    def __getitem__(self, position):
+        return self.__values[position]
+
+    def __iter__(self):
+        return iter(self.__values)
+
+    def __len__(self):
+        return len(self.__values)
+
+    def __str__(self):
+        return f'SearchIndex[size={len(self)}, indexes={self.indexes}]'
+    __repr__ = __str__
+
+
+class IndexedObject(object):
+    '''A mixin which updates every SearchIndex containing the object whenever
+    one of its public attributes is set or deleted, see `SearchIndex.update`.
+    Attributes starting with '_' are not searched, so are only tracked if
+    the class defines properties, which may be computed from them.  Changes
+    to any other state properties depend on, e.g. a mutable attribute
+    modified in place, require calling `SearchIndex.update`.
+    '''
+    def __setattr__(self, name, value):
+        super(IndexedObject, self).__setattr__(name, value)
+        if self.__is_tracked(name):
+            self.__update_search_indexes()
+
+    def __delattr__(self, name):
+        super(IndexedObject, self).__delattr__(name)
+        if self.__is_tracked(name):
+            self.__update_search_indexes()
+
+    def __is_tracked(self, name):
+        '''Returns True if setting, or deleting, the attribute name may change
+        the attributes searched
+        '''
+        if not name.startswith('_'):
+            return True
+        return name != '_search_indexes' \
+            and bool(get_schema(type(self)).properties)
+
+    def _add_search_index(self, search_index):
+        '''Registers search_index as containing the object'''
+        indexes = getattr(self, '_search_indexes', None)
+        if indexes is None:
+            indexes = self._search_indexes = weakref.WeakSet()
+        indexes.add(search_index)
+
+    def _remove_search_index(self, search_index):
+        '''Unregisters search_index as containing the object'''
+        getattr(self, '_search_indexes', set()).discard(search_index)
+
+    def __update_search_indexes(self):
+        for search_index in list(getattr(self, '_search_indexes', ())):
+            search_index.update(self)
+
+
+from . import storage
+from .advisor import IndexAdvisor
+from .column_index import ColumnIndex
+from .hash_index import HashIndex
+from .name_index import NameIndex
+from .ngram_index import NgramIndex
+from .range_index import RangeIndex
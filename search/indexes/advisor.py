@@ -0,0 +1,216 @@
+# advisor.py
+from collections import namedtuple
+
+from ..field import Field
+from . import INDEX_TYPES, FieldIndex, is_comparable
+
+# The number of values sampled to estimate the size of an index
+SAMPLE_SIZE = 1000
+
+# The number of expressions evaluated between automatically creating indexes
+AUTO_CREATE_INTERVAL = 1000
+
+
+Recommendation = namedtuple('Recommendation', 'name kind benefit size')
+Recommendation.__doc__ = '''An index recommended by IndexAdvisor.recommend
+
+    Parameters:
+        name - the field name
+        kind - the type of index, one of INDEX_TYPES
+        benefit - the time, in seconds, spent scanning values by the
+            expressions the index resolves
+        size - an estimate of the memory, in bytes, used by the index
+'''
+
+
+class WorkloadStatistics(object):
+    '''The workload of an operator on a field: the number of expressions
+    evaluated, and the number of values scanned, evaluated without an index,
+    and the time spent by the expressions which scanned values.
+    '''
+    def __init__(self):
+        self.calls = 0
+        self.scanned = 0
+        self.elapsed = 0.0
+
+    def record(self, scanned, elapsed):
+        '''Records the evaluation of an expression
+
+        Parameters:
+            scanned - the number of values evaluated without an index
+            elapsed - the time, in seconds, the evaluation took
+        '''
+        self.calls += 1
+        if scanned:
+            self.scanned += scanned
+            self.elapsed += elapsed
+
+    def __str__(self):
+        return f'calls={self.calls:,} scanned={self.scanned:,} ' \
+            f'elapsed={self.elapsed:,.4f}s'
+
+
+class IndexAdvisor(object):
+    '''Records the workload of a SearchIndex, the field names and operators
+    of the expressions evaluated by the tree engine, and the values each
+    scanned, and recommends the indexes which save the most time scanning
+    values for the memory they use.  Statistics are updated without locking,
+    so are approximate when queries are executed by multiple threads.
+
+    Parameters:
+        search_index - the SearchIndex whose workload is recorded
+    '''
+    def __init__(self, search_index):
+        self.__search_index = search_index
+        self.__workload = {}
+
+        # The memory budget remaining, and the number of expressions since
+        # indexes were created, when creating indexes automatically
+        self.__auto_create = None
+        self.__auto_create_interval = AUTO_CREATE_INTERVAL
+        self.__calls = 0
+
+    def record(self, expression, scanned, elapsed):
+        '''Records the evaluation of expression, see `WorkloadStatistics`.
+        Expressions of nested fields, which can not be indexed, are ignored.
+        '''
+        field = expression.field
+        if field.is_nested_type:
+            return
+
+        key = (field.name, expression.EXPRESSION_NAME)
+        statistics = self.__workload.get(key)
+        if statistics is None:
+            statistics = self.__workload[key] = WorkloadStatistics()
+        statistics.record(scanned, elapsed)
+
+        if self.__auto_create is not None:
+            self.__calls += 1
+            if self.__calls >= self.__auto_create_interval:
+                self.__calls = 0
+                created = self.create_indexes(self.__auto_create)
+                self.__auto_create -= sum(r.size for r in created)
+
+    def workload(self):
+        '''Returns a list of (field name, operator, WorkloadStatistics)
+        tuples, of the most time spent scanning values first
+        '''
+        workload = [(name, operator, statistics)
+            for (name, operator), statistics in self.__workload.items()]
+        workload.sort(key=lambda w: w[2].elapsed, reverse=True)
+        return workload
+
+    def reset(self):
+        '''Clears the recorded workload'''
+        self.__workload = {}
+
+    def recommend(self, memory_budget=None):
+        '''Returns a list of Recommendations, of the indexes which resolve
+        the expressions which scanned values, and do not exist.  Indexes
+        are recommended in order of the time spent scanning values, for the
+        memory used, until the memory budget is spent.
+
+        Parameters:
+            memory_budget - the memory, in bytes, the indexes recommended may
+                use, estimated from a sample of the values, or None to
+                recommend every index
+        '''
+        kinds = {cls: kind for kind, cls in INDEX_TYPES.items()}
+        indexes = [index for index in self.__search_index.indexes
+            if isinstance(index, FieldIndex)]
+        existing = {(index.name, kinds.get(type(index))) for index in indexes}
+
+        # The time spent, and operators, of the expressions each index of a
+        # field resolves
+        benefits = {}
+        for (name, operator), statistics in self.__workload.items():
+            if not statistics.scanned:
+                continue
+            for kind, cls in INDEX_TYPES.items():
+                if operator in cls.OPERATORS and (name, kind) not in existing:
+                    benefit, operators = \
+                        benefits.get((name, kind), (0.0, frozenset()))
+                    benefits[(name, kind)] = (
+                        benefit + statistics.elapsed, operators | {operator})
+
+        candidates = []
+        for (name, kind), (benefit, operators) in benefits.items():
+            try:
+                size = self.estimate_size(name, kind)
+            except TypeError:
+                # The values of the field can not be indexed, e.g. a dict
+                # with keys which are not strings
+                continue
+            candidates.append(
+                (Recommendation(name, kind, benefit, size), operators))
+        candidates.sort(
+            key=lambda c: c[0].benefit / max(c[0].size, 1), reverse=True)
+
+        # Indexes resolving only operators of a field resolved by an existing
+        # index, or an index already recommended, e.g. a range index after a
+        # column index, are not recommended
+        resolved = {(index.name, operator) for index in indexes
+            for operator in index.OPERATORS}
+        recommendations = []
+        for recommendation, operators in candidates:
+            name = recommendation.name
+            if all((name, operator) in resolved for operator in operators):
+                continue
+            if memory_budget is None or recommendation.size <= memory_budget:
+                recommendations.append(recommendation)
+                resolved.update((name, operator) for operator in operators)
+                if memory_budget is not None:
+                    memory_budget -= recommendation.size
+        return recommendations
+
+    def create_indexes(self, memory_budget=None):
+        '''Creates the recommended indexes, see `recommend`, and returns their
+        Recommendations
+        '''
+        recommendations = self.recommend(memory_budget)
+        for recommendation in recommendations:
+            self.__search_index.create_index(
+                recommendation.name, recommendation.kind)
+        return recommendations
+
+    def enable_auto_create(self, memory_budget=None,
+            interval=AUTO_CREATE_INTERVAL):
+        '''Creates the recommended indexes, see `create_indexes`, every
+        interval expressions evaluated, until the memory budget is spent.
+        Indexes are created while the query evaluating the last expression is
+        executed.
+
+        Parameters:
+            memory_budget - the memory, in bytes, the indexes created may use,
+                or None for no limit
+            interval - the number of expressions evaluated between creating
+                indexes
+        '''
+        assert interval > 0, f'interval must be positive: actual {interval}'
+        self.__auto_create = float('inf') if memory_budget is None \
+            else memory_budget
+        self.__auto_create_interval = interval
+        self.__calls = 0
+
+    def disable_auto_create(self):
+        '''Stops creating indexes automatically'''
+        self.__auto_create = None
+
+    def estimate_size(self, name, kind):
+        '''Returns an estimate of the memory, in bytes, used by an index of
+        type kind of the field name, from a sample of SAMPLE_SIZE values
+        '''
+        values = self.__search_index
+        if not len(values):
+            return 0
+
+        lookup = Field(name, '').lookup
+        step = max(1, len(values) // SAMPLE_SIZE)
+        sample = [lookup(values[i]) for i in range(0, len(values), step)]
+        comparable = [value for value in sample if is_comparable(value)]
+        count = len(values) * len(comparable) // len(sample)
+        return INDEX_TYPES[kind].estimate_size(comparable, count)
+
+    def __str__(self):
+        return f'IndexAdvisor[workload={len(self.__workload)}]'
+    __repr__ = __str__
@@ -0,0 +1,160 @@
+# column_index.py
+#
+# A columnar index, requiring numpy, which is an optional dependency: the
+# 'column' index type is only registered if numpy is installed.  numpy is
+# imported when the first ColumnIndex is used, rather than by `import search`.
+from importlib.util import find_spec
+
+from .. import bitmap
+from . import FieldIndex, is_comparable, register_index
+
+# The numpy dtype of the column of each type of value compared vectorized.
+# Values of any other type are evaluated by the expression itself.
+DTYPES = {int: 'int64', float: 'float64'}
+
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+class ColumnIndex(FieldIndex):
+    '''A columnar index of the values of a field, which resolves '=', '!=',
+    '<', '<=', '>' and '>=' expressions by comparing the query value,
+    converted to the type of the values, to a numpy array of every value of
+    that type at once.  The boolean mask is converted to a bitmap, which the
+    tree engine combines with the bitmaps of the other expressions.
+
+    Values are partitioned by type, into a column per type, see DTYPES, so a
+    query value is only compared to values of the type it was converted to.
+    Columns are indexed by position, so values are inserted and removed in
+    place.  Values of any other type, e.g. strings, bools and ints which do
+    not fit in 64 bits, are evaluated by the expression itself.
+    '''
+    OPERATORS = ('=', '!=', '<', '<=', '>', '>=')
+    BYTES_PER_VALUE = 8  # an int64 or float64, per column
+
+    def __init__(self, name, values):
+        super(ColumnIndex, self).__init__(name, values)
+        import numpy
+
+        columns = {}
+        unresolved = []
+
+        lookup = self.field.lookup
+        for position, obj in enumerate(values):
+            value = lookup(obj)
+            if not is_comparable(value):
+                continue
+
+            if is_vectorized(value):
+                positions, _values = columns.setdefault(type(value), ([], []))
+                positions.append(position)
+                _values.append(value)
+            else:
+                unresolved.append(position)
+
+        # For each type, the column of values, by position, and the bitmap of
+        # the positions whose value is in the column
+        self.__columns = {}
+        self.__positions = {}
+        for _type, (positions, _values) in columns.items():
+            column = numpy.zeros(len(values), dtype=DTYPES[_type])
+            column[positions] = _values
+            self.__columns[_type] = column
+            self.__positions[_type] = bitmap.from_positions(positions)
+
+        self.__unresolved = bitmap.from_positions(unresolved)
+
+    @classmethod
+    def estimate_size(cls, sample, count):
+        '''Returns an estimate of the memory, in bytes, used by an index of
+        count values, see `FieldIndex.estimate_size`.  Raises TypeError if no
+        value of the sample is compared vectorized.
+        '''
+        types = {type(value) for value in sample if is_vectorized(value)}
+        if not types:
+            raise TypeError('no values of the sample are vectorized')
+        return count * cls.BYTES_PER_VALUE * len(types)
+
+    def search(self, expression, candidates):
+        field = expression.field
+        op_func = expression.EXPRESSION
+
+        matched = 0
+        unresolved = self.__unresolved & candidates
+
+        for _type, column in self.__columns.items():
+            positions = self.__positions[_type] & candidates
+            if not positions:
+                continue
+
+            # Compares the Field's value converted to the type of the values
+            key = field.convert(_type)
+            if not is_vectorized(key) or type(key) is not _type:
+                # The value could not be converted, and so is compared as it
+                # would be without the index
+                unresolved |= positions
+                continue
+
+            matched |= from_mask(op_func(column, key)) & positions
+
+        return matched, unresolved
+
+    def insert(self, position, obj):
+        import numpy
+
+        value = self.field.lookup(obj)
+        if not is_comparable(value):
+            return
+        if not is_vectorized(value):
+            self.__unresolved |= 1 << position
+            return
+
+        _type = type(value)
+        column = self.__columns.get(_type)
+        if column is None or position >= len(column):
+            # Columns grow by doubling, so appending values is amortized O(1)
+            size = 0 if column is None else len(column)
+            grown = numpy.zeros(
+                max(position + 1, size * 2), dtype=DTYPES[_type])
+            if column is not None:
+                grown[:size] = column
+            column = self.__columns[_type] = grown
+
+        column[position] = value
+        self.__positions[_type] = \
+            self.__positions.get(_type, 0) | 1 << position
+
+    def remove(self, position):
+        # The value left in the column is never matched
+        mask = ~(1 << position)
+        self.__unresolved &= mask
+        for _type, positions in self.__positions.items():
+            self.__positions[_type] = positions & mask
+
+    def __len__(self):
+        '''Returns the number of values indexed in columns'''
+        return sum(bitmap.count(p) for p in self.__positions.values())
+
+
+if find_spec('numpy') is not None:
+    register_index('column')(ColumnIndex)
+
+
+def is_vectorized(value):
+    '''Returns True if value is stored in a column, and so is compared
+    vectorized; otherwise False
+    '''
+    _type = type(value)
+    if _type is int:
+        return INT64_MIN <= value <= INT64_MAX
+    return _type in DTYPES
+
+
+def from_mask(mask):
+    '''Returns a bitmap of the positions of the True values of mask, a numpy
+    array of bools
+    '''
+    import numpy
+
+    return int.from_bytes(
+        numpy.packbits(mask, bitorder='little').tobytes(), 'little')
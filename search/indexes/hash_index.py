@@ -0,0 +1,173 @@
+# hash_index.py
+from decimal import Decimal
+
+from .. import bitmap
+from . import (
+    NOT_INDEXED,
+    FieldIndex,
+    add_position,
+    is_comparable,
+    is_special_match,
+    iter_postings,
+    pop_position,
+    postings,
+    register_index,
+    remove_position,
+    set_position,
+    to_bitmap,
+)
+
+
+@register_index('hash')
+class HashIndex(FieldIndex):
+    '''A hash index of the values of a field, which resolves '=' and '!='
+    expressions by looking up the query value converted to the type of each
+    distinct indexed value, rather than converting and comparing the query
+    value for every object.  Values are keyed per type, so a query value is
+    only equal to values of the type it was converted to.  Unhashable values
+    are not indexed and are evaluated by the expression itself.
+    '''
+    OPERATORS = ('=', '!=')
+    BYTES_PER_VALUE = 8  # a position
+    BYTES_PER_KEY = 120  # a dict entry and its postings
+
+    def __init__(self, name, values):
+        super(HashIndex, self).__init__(name, values)
+
+        keys = {}
+        unresolved = []
+
+        lookup = self.field.lookup
+        for position, obj in enumerate(values):
+            value = lookup(obj)
+            if not is_comparable(value):
+                continue
+
+            if is_nan(value) or not is_hashable(value):
+                unresolved.append(position)
+            else:
+                keys.setdefault(type(value), {}) \
+                    .setdefault(value, []).append(position)
+
+        # For each type, the postings of each distinct value, the bitmap of
+        # every position, and the keys of its falsy values, which are only
+        # matched by special query values
+        self.__keys = {}
+        self.__positions = {}
+        self.__falsy = {}
+        for _type, _keys in keys.items():
+            self.__keys[_type] = {k: postings(p) for k, p in _keys.items()}
+            self.__positions[_type] = bitmap.from_positions(
+                sorted(p for positions in _keys.values() for p in positions))
+            self.__falsy[_type] = [k for k in _keys if not k]
+
+        self.__unresolved = bitmap.from_positions(unresolved)
+
+    def search(self, expression, candidates):
+        field = expression.field
+        matched = 0
+        unresolved = self.__unresolved & candidates
+
+        for _type, keys in self.__keys.items():
+            positions = self.__positions[_type] & candidates
+            if not positions:
+                continue
+
+            # Matches the Field's value converted to the type of the values
+            key = field.convert(_type)
+            try:
+                equal = keys.get(key)
+            except TypeError:
+                unresolved |= positions
+                continue
+
+            if equal is not None and (key or is_special_match(key, field.value)):
+                equal = to_bitmap(equal) & positions
+            else:
+                equal = 0
+
+            if expression.EXPRESSION_NAME == '=':
+                matched |= equal
+                continue
+
+            # Every comparable value not equal to the Field's value
+            for falsy in self.__falsy.get(_type, ()):
+                if not is_special_match(falsy, field.value):
+                    positions &= ~to_bitmap(keys[falsy])
+            matched |= positions & ~equal
+
+        return matched, unresolved
+
+    def insert(self, position, obj):
+        value = self.field.lookup(obj)
+        if not is_comparable(value):
+            set_position(self._get_indexed(), position, NOT_INDEXED)
+            return
+
+        set_position(self._get_indexed(), position, value)
+        if is_nan(value) or not is_hashable(value):
+            self.__unresolved |= 1 << position
+            return
+
+        _type = type(value)
+        keys = self.__keys.setdefault(_type, {})
+        _postings = keys.get(value)
+        if _postings is None:
+            _postings = postings([])
+            if not value:
+                self.__falsy.setdefault(_type, []).append(value)
+        keys[value] = add_position(_postings, position)
+        self.__positions[_type] = \
+            self.__positions.get(_type, 0) | 1 << position
+
+    def remove(self, position):
+        value = pop_position(self._get_indexed(), position)
+        if value is NOT_INDEXED:
+            return
+        if self.__unresolved >> position & 1:
+            self.__unresolved &= ~(1 << position)
+            return
+
+        _type = type(value)
+        keys = self.__keys[_type]
+        _postings = remove_position(keys[value], position)
+        if _postings:
+            keys[value] = _postings
+        else:
+            del keys[value]
+            if not value:
+                self.__falsy[_type].remove(value)
+
+        if keys:
+            self.__positions[_type] &= ~(1 << position)
+        else:
+            del self.__keys[_type]
+            del self.__positions[_type]
+            self.__falsy.pop(_type, None)
+
+    def _invert(self):
+        '''Returns a dict of each position to the value indexed at it'''
+        items = {}
+        for keys in self.__keys.values():
+            for key, _postings in keys.items():
+                items.update(dict.fromkeys(iter_postings(_postings), key))
+        items.update(dict.fromkeys(bitmap.iter_positions(self.__unresolved)))
+        return items
+
+    def __len__(self):
+        '''Returns the number of distinct values indexed'''
+        return sum(len(keys) for keys in self.__keys.values())
+
+
+def is_hashable(value):
+    '''Returns True if value is hashable; otherwise False'''
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def is_nan(value):
+    '''Returns True if value is a float or Decimal NaN; otherwise False'''
+    return isinstance(value, (float, Decimal)) and value != value
@@ -0,0 +1,152 @@
+# name_index.py
+from .. import bitmap
+from ..field import get_attributes
+from . import (
+    NOT_INDEXED,
+    Index,
+    add_position,
+    is_comparable,
+    iter_postings,
+    pop_position,
+    postings,
+    remove_position,
+    set_position,
+    to_bitmap,
+)
+
+
+class NameIndex(Index):
+    '''An inverted index of attribute names to the positions of the objects
+    having an attribute of that name.  Field names are matched against the
+    distinct attribute names, rather than the attributes of every object.
+
+    'ANY' expressions, e.g. `fo0d`, are resolved completely: an object
+    matches if the value of every attribute whose name matches is compared,
+    see `is_comparable`, and does not match if none are.  For every other
+    expression, only the objects having an attribute whose name matches are
+    evaluated.  Nested fields are not resolved.
+
+    Parameters:
+        values - the sequence of values to index
+    '''
+    def __init__(self, values):
+        names = {}
+        unresolved = []
+
+        for position, obj in enumerate(values):
+            attributes = read_names(obj)
+            if attributes is None:
+                unresolved.append(position)
+                continue
+
+            # For each name, the positions of the objects whose value is not
+            # compared, and is compared, by 'ANY' expressions
+            for compared, _names in enumerate(attributes):
+                for name in _names:
+                    names.setdefault(name, ([], []))[compared].append(position)
+
+        self.__names = {
+            name: [postings(p) for p in positions]
+            for name, positions in names.items()
+        }
+        self.__unresolved = bitmap.from_positions(unresolved)
+
+    def supports(self, expression):
+        return not expression.field.is_nested_type
+
+    def search(self, expression, candidates):
+        field = expression.field
+        regex = field.compile_regex(field.name)
+
+        compared = 0
+        not_compared = 0
+        for name, (_not_compared, _compared) in self.__names.items():
+            if regex.search(name) is not None:
+                not_compared |= to_bitmap(_not_compared)
+                compared |= to_bitmap(_compared)
+
+        unresolved = self.__unresolved & candidates
+        if expression.EXPRESSION_NAME != 'ANY':
+            return 0, unresolved | (compared | not_compared) & candidates
+
+        # Objects with both compared and not compared matching attributes
+        # depend on which attribute is matched first
+        matched = compared & ~not_compared & ~unresolved & candidates
+        return matched, unresolved | compared & not_compared & candidates
+
+    def insert(self, position, obj):
+        attributes = read_names(obj)
+        set_position(self._get_indexed(), position, attributes)
+        if attributes is None:
+            self.__unresolved |= 1 << position
+            return
+
+        for compared, _names in enumerate(attributes):
+            for name in _names:
+                positions = self.__names.setdefault(
+                    name, [postings([]), postings([])])
+                positions[compared] = add_position(
+                    positions[compared], position)
+
+    def remove(self, position):
+        attributes = pop_position(self._get_indexed(), position)
+        if attributes is NOT_INDEXED:
+            return
+        if attributes is None:
+            self.__unresolved &= ~(1 << position)
+            return
+
+        for compared, _names in enumerate(attributes):
+            for name in _names:
+                positions = self.__names[name]
+                positions[compared] = remove_position(
+                    positions[compared], position)
+                if not any(positions):
+                    del self.__names[name]
+
+    def _invert(self):
+        '''Returns a dict of each position to the attribute names indexed at
+        it, see `read_names`
+        '''
+        items = {}
+        for name, positions in self.__names.items():
+            for compared, _postings in enumerate(positions):
+                for position in iter_postings(_postings):
+                    items.setdefault(position, ([], []))[compared].append(name)
+
+        items = {position: tuple(map(tuple, names))
+            for position, names in items.items()}
+        items.update(dict.fromkeys(bitmap.iter_positions(self.__unresolved)))
+        return items
+
+    def names(self):
+        '''Returns a list of the distinct attribute names indexed'''
+        return list(self.__names)
+
+    def __len__(self):
+        '''Returns the number of distinct attribute names indexed'''
+        return len(self.__names)
+
+    def __str__(self):
+        return f'{self.__class__.__name__}[names={len(self)}]'
+    __repr__ = __str__
+
+
+def read_names(obj):
+    '''Returns the attribute names of obj, as a tuple of (not compared,
+    compared) tuples of names, see `is_comparable`, or None if the attributes
+    of obj can not be indexed
+    '''
+    try:
+        attributes = get_attributes(obj)
+    except Exception:
+        # Evaluate objects whose attributes can not be read, so any error is
+        # raised by the expression
+        return None
+
+    names = ([], [])
+    for name, value in attributes:
+        if type(name) is not str:
+            return None
+        names[is_comparable(value)].append(name)
+    return tuple(names[0]), tuple(names[1])
@@ -0,0 +1,277 @@
+# ngram_index.py
+from collections import defaultdict
+import re
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:
+    # python < 3.11
+    import sre_constants, sre_parse
+
+from .. import bitmap
+from . import (
+    NOT_INDEXED,
+    FieldIndex,
+    add_position,
+    estimate_distinct,
+    is_comparable,
+    is_special_match,
+    iter_postings,
+    pop_position,
+    postings,
+    register_index,
+    remove_position,
+    set_position,
+    to_bitmap,
+)
+
+# The length of the substrings indexed
+NGRAM_SIZE = 3
+
+_REPEATS = tuple(getattr(sre_constants, name) for name in
+    ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+    if hasattr(sre_constants, name))
+_ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+
+
+def required_substrings(pattern):
+    '''Returns the substrings which every string matched by the regular
+    expression pattern contains, as a list whose items are either a str,
+    which every match contains, or a tuple of alternatives, each a list in
+    the same format, one of which every match satisfies.  Case insensitive
+    patterns have no required substrings.
+
+    Parameters:
+        pattern - a regular expression, as a string
+    '''
+    parsed = sre_parse.parse(pattern)
+    state = getattr(parsed, 'state', None) or parsed.pattern
+    if state.flags & re.IGNORECASE:
+        return []
+    return _required_substrings(parsed)
+
+
+def _required_substrings(subpattern):
+    '''Returns the required substrings of a parsed subpattern'''
+    required = []
+    literal = []
+
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            literal.append(chr(av))
+            continue
+
+        # Any other op ends the literal
+        if literal:
+            required.append(''.join(literal))
+            literal = []
+
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, _, p = av
+            if not add_flags & re.IGNORECASE:
+                required.extend(_required_substrings(p))
+        elif op is _ATOMIC_GROUP:
+            required.extend(_required_substrings(av))
+        elif op in _REPEATS:
+            minimum, _, p = av
+            if minimum >= 1:
+                required.extend(_required_substrings(p))
+        elif op is sre_constants.BRANCH:
+            required.append(
+                tuple(_required_substrings(p) for p in av[1]))
+
+    if literal:
+        required.append(''.join(literal))
+    return required
+
+
+def ngrams(string):
+    '''Returns the set of substrings, of length NGRAM_SIZE, of string'''
+    return {string[i:i + NGRAM_SIZE]
+        for i in range(len(string) - NGRAM_SIZE + 1)}
+
+
+@register_index('ngram')
+class NgramIndex(FieldIndex):
+    '''An index of the substrings, of length NGRAM_SIZE, of the string values
+    of a field, which resolves 'like' expressions.  The substrings every
+    match of the query's regular expression must contain are extracted from
+    the regular expression, and the regular expression is only searched for
+    in the distinct values containing them.  Regular expressions without
+    required substrings, e.g. case insensitive regular expressions, are
+    searched for in every distinct value.  Values which are not strings are
+    evaluated by the expression itself.  Strings are kept after every value
+    equal to them is removed.
+    '''
+    OPERATORS = ('LIKE',)
+    BYTES_PER_KEY = 100  # a string's id and postings
+    BYTES_PER_NGRAM = 8  # the id of a string containing an ngram
+
+    def __init__(self, name, values):
+        super(NgramIndex, self).__init__(name, values)
+
+        ids = {}
+        positions = []
+        unresolved = []
+
+        lookup = self.field.lookup
+        for position, obj in enumerate(values):
+            value = lookup(obj)
+            if type(value) is str:
+                _id = ids.setdefault(value, len(ids))
+                if _id == len(positions):
+                    positions.append([])
+                positions[_id].append(position)
+            elif is_comparable(value):
+                unresolved.append(position)
+
+        grams = defaultdict(list)
+        for string, _id in ids.items():
+            for gram in ngrams(string):
+                grams[gram].append(_id)
+
+        # The distinct strings, and their ids, the positions of each string,
+        # and the ids of the strings containing each ngram
+        self.__ids = ids
+        self.__strings = list(ids)
+        self.__positions = [postings(p) for p in positions]
+        self.__all_positions = bitmap.from_positions(
+            sorted(p for _positions in positions for p in _positions))
+        self.__grams = {gram: postings(_ids) for gram, _ids in grams.items()}
+        self.__unresolved = bitmap.from_positions(unresolved)
+
+    @classmethod
+    def estimate_size(cls, sample, count):
+        strings = [value for value in sample if type(value) is str]
+        if not strings:
+            return 0
+
+        # Each distinct string is indexed by each of its ngrams
+        count = count * len(strings) // len(sample)
+        distinct = set(strings)
+        grams = sum(len(ngrams(s)) for s in distinct) / len(distinct)
+        return int(count * cls.BYTES_PER_VALUE
+            + estimate_distinct(strings, count)
+            * (cls.BYTES_PER_KEY + grams * cls.BYTES_PER_NGRAM))
+
+    def search(self, expression, candidates):
+        field = expression.field
+        unresolved = self.__unresolved & candidates
+
+        # Empty regular expressions never match
+        value = field.convert(str)
+        if not value or not self.__all_positions & candidates:
+            return 0, unresolved
+
+        ids = self.__match_all(required_substrings(value))
+        ids = bitmap.full(len(self.__strings)) if ids is None else ids
+
+        # Evaluate the candidates directly if there are fewer candidates
+        # than strings to search
+        if bitmap.count(candidates) < bitmap.count(ids):
+            return 0, candidates
+
+        regex = re.compile(value)
+        matched = 0
+        matched_positions = []
+        for _id in bitmap.iter_positions(ids):
+            string = self.__strings[_id]
+            if not string and not is_special_match(string, field.value):
+                continue
+            if regex.search(string) is None:
+                continue
+
+            _positions = self.__positions[_id]
+            if isinstance(_positions, int):
+                matched |= to_bitmap(_positions)
+            else:
+                matched_positions.extend(_positions)
+
+        matched |= bitmap.from_positions(matched_positions)
+        return matched & candidates, unresolved
+
+    def insert(self, position, obj):
+        value = self.field.lookup(obj)
+        if type(value) is not str:
+            if is_comparable(value):
+                set_position(self._get_indexed(), position, None)
+                self.__unresolved |= 1 << position
+            else:
+                set_position(self._get_indexed(), position, NOT_INDEXED)
+            return
+
+        _id = self.__ids.get(value)
+        if _id is None:
+            _id = self.__ids[value] = len(self.__strings)
+            self.__strings.append(value)
+            self.__positions.append(postings([]))
+            for gram in ngrams(value):
+                self.__grams[gram] = add_position(
+                    self.__grams.get(gram, postings([])), _id)
+
+        set_position(self._get_indexed(), position, _id)
+        self.__positions[_id] = add_position(self.__positions[_id], position)
+        self.__all_positions |= 1 << position
+
+    def remove(self, position):
+        _id = pop_position(self._get_indexed(), position)
+        if _id is None:
+            self.__unresolved &= ~(1 << position)
+        elif _id is not NOT_INDEXED:
+            self.__positions[_id] = remove_position(
+                self.__positions[_id], position)
+            self.__all_positions &= ~(1 << position)
+
+    def _invert(self):
+        '''Returns a dict of each position to the id of the string indexed
+        at it
+        '''
+        items = {}
+        for _id, _postings in enumerate(self.__positions):
+            items.update(dict.fromkeys(iter_postings(_postings), _id))
+        items.update(dict.fromkeys(bitmap.iter_positions(self.__unresolved)))
+        return items
+
+    def __match_all(self, required):
+        '''Returns a bitmap of the ids of the strings containing every
+        required substring, or None if every string may match.
+        '''
+        results = None
+        for item in required:
+            if isinstance(item, str):
+                ids = self.__match_substring(item)
+            else:
+                ids = self.__match_any(item)
+
+            if ids is not None:
+                results = ids if results is None else results & ids
+        return results
+
+    def __match_any(self, alternatives):
+        '''Returns a bitmap of the ids of the strings matching any of the
+        alternatives, or None if every string may match.
+        '''
+        results = 0
+        for required in alternatives:
+            ids = self.__match_all(required)
+            if ids is None:
+                return None
+            results |= ids
+        return results
+
+    def __match_substring(self, substring):
+        '''Returns a bitmap of the ids of the strings containing every ngram
+        of substring, or None if substring is shorter than an ngram.
+        '''
+        results = None
+        for gram in ngrams(substring):
+            ids = self.__grams.get(gram)
+            if ids is None:
+                return 0
+            ids = to_bitmap(ids)
+            results = ids if results is None else results & ids
+        return results
+
+    def __len__(self):
+        '''Returns the number of distinct strings indexed'''
+        return len(self.__strings)
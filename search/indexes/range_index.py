@@ -0,0 +1,340 @@
+# range_index.py
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import chain, groupby, repeat
+from operator import itemgetter
+
+from .. import bitmap
+from . import (
+    NOT_INDEXED,
+    FieldIndex,
+    is_comparable,
+    is_special_match,
+    pop_position,
+    register_index,
+    set_position,
+)
+
+# Types whose values are totally ordered, and so can be binary searched.
+# Values of any other type are evaluated by the expression itself.
+ORDERED_TYPES = frozenset(
+    (bool, int, float, Decimal, str, date, datetime, time, timedelta))
+
+# The number of blocks the sorted positions of each type are divided into,
+# and the minimum size of a block.  The bitmap of the positions preceding each
+# block is stored, so a range is built from two stored bitmaps and at most two
+# partial blocks, see RangeIndex.search.
+BLOCK_COUNT = 64
+MIN_BLOCK_SIZE = 256
+
+# For each operator, a function returning the bounds, (lower, upper), of the
+# sorted keys satisfying the operator: `keys[lower:upper]`
+BOUNDS = {
+    '<': lambda keys, key: (0, bisect_left(keys, key)),
+    '<=': lambda keys, key: (0, bisect_right(keys, key)),
+    '>': lambda keys, key: (bisect_right(keys, key), len(keys)),
+    '>=': lambda keys, key: (bisect_left(keys, key), len(keys)),
+}
+
+
+@register_index('range')
+class RangeIndex(FieldIndex):
+    '''A sorted index of the values of a field, which resolves '<', '<=', '>'
+    and '>=' expressions by binary searching the query value, converted to
+    the type of the indexed values, rather than comparing the query value to
+    every object.  Values are partitioned by type, and each partition is
+    sorted, so a query value is only compared to values of the type it was
+    converted to.  Values of types which are not ordered, see ORDERED_TYPES,
+    are evaluated by the expression itself.
+
+    Values inserted after the index is built are kept in a small sorted list
+    per type, and removed values are excluded from the partitions, until the
+    number of changes exceeds the size of a block, when the partitions are
+    rebuilt from their sorted keys, see `RangeIndex.merge`.
+    '''
+    OPERATORS = tuple(BOUNDS)
+    BYTES_PER_VALUE = 24  # a key, a position and the prefix bitmaps
+
+    def __init__(self, name, values):
+        super(RangeIndex, self).__init__(name, values)
+
+        partitions = {}
+        unresolved = []
+
+        lookup = self.field.lookup
+        for position, obj in enumerate(values):
+            value = lookup(obj)
+            if not is_comparable(value):
+                continue
+
+            if is_ordered(value):
+                partitions.setdefault(type(value), []).append((value, position))
+            else:
+                unresolved.append(position)
+
+        self.__unresolved = bitmap.from_positions(unresolved)
+        self.__build(partitions)
+
+    def __build(self, partitions):
+        '''Builds the sorted partitions, and clears the changes since
+
+        Parameters:
+            partitions - a dict of each type to a list of (key, position)
+                tuples, of every position indexed in the sorted partitions
+        '''
+        # For each type: the sorted keys, the position of each key, the
+        # bitmaps of the positions preceding each block of keys, the block
+        # size, the bitmap of every position, and the number of falsy keys,
+        # which sort first and are only matched by special query values
+        self.__partitions = {}
+        size = 0
+        for _type, pairs in partitions.items():
+            try:
+                pairs.sort(key=itemgetter(0))
+            except TypeError:
+                # e.g. naive and timezone aware datetimes
+                self.__unresolved |= bitmap.from_positions(
+                    [position for _, position in pairs])
+                continue
+
+            keys = [key for key, _ in pairs]
+            positions = array('q', (position for _, position in pairs))
+            size += len(keys)
+
+            # The bitmaps of positions[:i * block_size]
+            block_size = max(MIN_BLOCK_SIZE, -(-len(keys) // BLOCK_COUNT))
+            prefixes = [0]
+            for start in range(0, len(keys) - block_size + 1, block_size):
+                prefixes.append(prefixes[-1] | bitmap.from_positions(
+                    positions[start:start + block_size].tolist()))
+
+            self.__partitions[_type] = (
+                keys,
+                positions,
+                prefixes,
+                block_size,
+                bitmap.from_positions(positions.tolist()),
+                count_falsy(keys),
+            )
+
+        # The positions removed from the partitions, and, for each type, the
+        # sorted keys, and the position of each key, inserted since
+        self.__removed = 0
+        self.__inserted = {}
+        self.__inserted_positions = set()
+        self.__changes = 0
+        self.__merge_size = max(MIN_BLOCK_SIZE, size // BLOCK_COUNT)
+
+    def merge(self):
+        '''Rebuilds the sorted partitions, including the values inserted, and
+        excluding the values removed, since they were built.  Called when the
+        number of changes exceeds the size of a block.
+        '''
+        partitions = {}
+        for _type, partition in self.__partitions.items():
+            keys, positions = partition[:2]
+            removed = self.__removed & partition[4]
+            if removed:
+                removed = set(bitmap.iter_positions(removed))
+                partitions[_type] = [(key, position) for key, position
+                    in zip(keys, positions) if position not in removed]
+            else:
+                partitions[_type] = list(zip(keys, positions))
+
+        # The inserted keys are sorted, so each partition is two sorted runs
+        for _type, (keys, positions) in self.__inserted.items():
+            partitions.setdefault(_type, []).extend(zip(keys, positions))
+
+        self.__build(partitions)
+
+    def search(self, expression, candidates):
+        field = expression.field
+        bounds = BOUNDS[expression.EXPRESSION_NAME]
+
+        matched = 0
+        unresolved = self.__unresolved & candidates
+
+        for _type, partition in self.__partitions.items():
+            keys, positions, prefixes, block_size, all_positions, falsy = \
+                partition
+            all_positions &= ~self.__removed & candidates
+            if not all_positions:
+                continue
+
+            try:
+                lower, upper = self.__bounds(field, bounds, keys, falsy, _type)
+            except TypeError:
+                # The value could not be converted, or compared, and so is
+                # compared, and fails, as it would be without the index
+                unresolved |= all_positions
+                continue
+
+            if lower >= upper:
+                continue
+
+            # The positions of the blocks from lower's block up to upper's
+            # block, plus the start of upper's block, minus the start of
+            # lower's block
+            lower_block = lower // block_size
+            upper_block = upper // block_size
+            in_range = prefixes[upper_block] & ~prefixes[lower_block] \
+                | bitmap.from_positions(
+                    positions[upper_block * block_size:upper].tolist())
+            in_range &= ~bitmap.from_positions(
+                positions[lower_block * block_size:lower].tolist())
+            matched |= in_range & all_positions
+
+        for _type, (keys, positions) in self.__inserted.items():
+            try:
+                lower, upper = self.__bounds(
+                    field, bounds, keys, count_falsy(keys), _type)
+            except TypeError:
+                unresolved |= bitmap.from_positions(positions) & candidates
+                continue
+
+            matched |= bitmap.from_positions(positions[lower:upper]) \
+                & candidates
+
+        return matched, unresolved
+
+    @staticmethod
+    def __bounds(field, bounds, keys, falsy, _type):
+        '''Returns the bounds, (lower, upper), of the sorted keys, of _type,
+        satisfying the expression.  Raises TypeError if the Field's value
+        could not be converted to, or compared with, _type.
+        '''
+        # Compares the Field's value converted to the type of the values
+        key = field.convert(_type)
+        if key != key:
+            # NaN is never ordered
+            return 0, 0
+
+        lower, upper = bounds(keys, key)
+        if falsy and not is_special_match(keys[0], field.value):
+            lower = max(lower, falsy)
+        return lower, upper
+
+    def insert(self, position, obj):
+        value = self.field.lookup(obj)
+        if not is_comparable(value):
+            set_position(self._get_indexed(), position, NOT_INDEXED)
+            return
+
+        set_position(self._get_indexed(), position, value)
+        if not is_ordered(value):
+            self.__unresolved |= 1 << position
+            return
+
+        keys, positions = self.__inserted.setdefault(type(value), ([], []))
+        try:
+            i = bisect_right(keys, value)
+        except TypeError:
+            if not keys:
+                del self.__inserted[type(value)]
+            self.__unresolved |= 1 << position
+            return
+
+        keys.insert(i, value)
+        positions.insert(i, position)
+        self.__inserted_positions.add(position)
+        self.__changed()
+
+    def remove(self, position):
+        value = pop_position(self._get_indexed(), position)
+        if value is NOT_INDEXED:
+            return
+
+        if position in self.__inserted_positions:
+            self.__inserted_positions.remove(position)
+            keys, positions = self.__inserted[type(value)]
+            i = bisect_left(keys, value)
+            while positions[i] != position:
+                i += 1
+            del keys[i], positions[i]
+            if not keys:
+                del self.__inserted[type(value)]
+        elif self.__unresolved >> position & 1:
+            self.__unresolved &= ~(1 << position)
+        else:
+            self.__removed |= 1 << position
+        self.__changed()
+
+    def __changed(self):
+        '''Merges the changes once they exceed the size of a block'''
+        self.__changes += 1
+        if self.__changes > self.__merge_size:
+            self.merge()
+
+    def _invert(self):
+        '''Returns a dict of each position to the value indexed at it, from
+        the partitions and the values inserted since
+        '''
+        items = {}
+        removed = set(bitmap.iter_positions(self.__removed))
+        for keys, positions, *_ in self.__partitions.values():
+            items.update((position, key) for key, position
+                in zip(keys, positions) if position not in removed)
+        for keys, positions in self.__inserted.values():
+            items.update(zip(positions, keys))
+        items.update(dict.fromkeys(bitmap.iter_positions(self.__unresolved)))
+        return items
+
+    def __getstate__(self):
+        state = super(RangeIndex, self).__getstate__()
+
+        # The sorted keys of each partition are stored as the distinct keys,
+        # and the number of each, which are far fewer for many fields
+        state['_RangeIndex__partitions'] = {
+            _type: (run_lengths(partition[0]),) + partition[1:]
+            for _type, partition in self.__partitions.items()
+        }
+        return state
+
+    def __setstate__(self, state):
+        state['_RangeIndex__partitions'] = {
+            _type: (from_run_lengths(*partition[0]),) + partition[1:]
+            for _type, partition in state['_RangeIndex__partitions'].items()
+        }
+        super(RangeIndex, self).__setstate__(state)
+
+    def __len__(self):
+        '''Returns the number of values indexed'''
+        return sum(len(p[0]) for p in self.__partitions.values()) \
+            - bitmap.count(self.__removed) \
+            + len(self.__inserted_positions)
+
+
+def is_ordered(value):
+    '''Returns True if value is of one of the ORDERED_TYPES, and is not NaN,
+    which is unordered; otherwise False
+    '''
+    return type(value) in ORDERED_TYPES and value == value
+
+
+def run_lengths(keys):
+    '''Returns the sorted keys as a tuple of (distinct keys, counts), the
+    list of each distinct key and an array of the number of each
+    '''
+    distinct = []
+    counts = array('q')
+    for key, group in groupby(keys):
+        distinct.append(key)
+        counts.append(sum(1 for _ in group))
+    return distinct, counts
+
+
+def from_run_lengths(distinct, counts):
+    '''Returns the sorted keys from their run lengths, see `run_lengths`'''
+    return list(chain.from_iterable(map(repeat, distinct, counts)))
+
+
+def count_falsy(keys):
+    '''Returns the number of falsy keys, which sort first, of the sorted
+    keys
+    '''
+    falsy = 0
+    while falsy < len(keys) and not keys[falsy]:
+        falsy += 1
+    return falsy
@@ -0,0 +1,137 @@
+# storage.py
+#
+# Saves indexes to, and loads indexes from, a binary file.  The state of the
+# indexes is pickled, except for their postings: arrays of positions are
+# stored as aligned arrays of int64, which are read, zero-copy, from a memory
+# map of the file, and bitmaps are stored as little endian bytes, which are
+# read with a single `int.from_bytes`.  Single positions, and bitmaps of fewer
+# than MIN_BITMAP_BITS, are small ints which are pickled with their keys, so
+# loading takes time proportional to the number of distinct keys.
+#
+#   MAGIC | data offset | header offset | header length | data | header
+#
+# The header is the pickled state, referencing the data by offset.
+
+from array import array
+from io import BytesIO
+import mmap
+import pickle
+import struct
+
+from . import NOT_INDEXED
+
+MAGIC = b'SRCHIDX1'
+PREAMBLE = struct.Struct('<8sQQQ')
+
+# The number of bits of a bitmap stored in the data, rather than pickled
+MIN_BITMAP_BITS = 1024
+
+# Arrays and bitmaps are stored at data offsets which are a multiple of
+ALIGNMENT = 8
+
+
+class _Pickler(pickle.Pickler):
+    '''Pickles the state of indexes, appending their postings to data'''
+    def __init__(self, file, data):
+        super(_Pickler, self).__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.data = data
+        self.offset = 0
+        # The persistent id of each object stored, by id, and the objects,
+        # so their ids are not reused
+        self.saved = {}
+        self.objects = []
+
+    def persistent_id(self, obj):
+        if obj is NOT_INDEXED:
+            return ('NOT_INDEXED',)
+
+        if isinstance(obj, (array, memoryview)):
+            if isinstance(obj, array) and obj.typecode != 'q':
+                return None
+            kind = 'array'
+        elif type(obj) is int and obj.bit_length() > MIN_BITMAP_BITS:
+            kind = 'bitmap'
+        else:
+            return None
+
+        pid = self.saved.get(id(obj))
+        if pid is None:
+            if kind == 'array':
+                buffer = memoryview(obj).cast('B')
+            else:
+                buffer = obj.to_bytes(
+                    (obj.bit_length() + 8) // 8, 'little', signed=True)
+            pid = self.saved[id(obj)] = (kind, self.offset, len(buffer))
+            self.objects.append(obj)
+            self.__write(buffer)
+        return pid
+
+    def __write(self, buffer):
+        self.data.append(buffer)
+        self.offset += len(buffer)
+
+        padding = -self.offset % ALIGNMENT
+        if padding:
+            self.data.append(bytes(padding))
+            self.offset += padding
+
+
+class _Unpickler(pickle.Unpickler):
+    '''Unpickles the state of indexes, reading their postings from data'''
+    def __init__(self, file, data):
+        super(_Unpickler, self).__init__(file)
+        self.data = data
+
+    def persistent_load(self, pid):
+        if pid[0] == 'NOT_INDEXED':
+            return NOT_INDEXED
+
+        kind, offset, length = pid
+        buffer = self.data[offset:offset + length]
+        if kind == 'array':
+            return buffer.cast('q')
+        if kind == 'bitmap':
+            return int.from_bytes(buffer, 'little', signed=True)
+        raise pickle.UnpicklingError(f'unsupported persistent id: {pid!r}')
+
+
+def save(state, path):
+    '''Saves state, the state of a SearchIndex, to the file path
+
+    Parameters:
+        state - a picklable object, containing indexes
+        path - the path of the file to create, or replace
+    '''
+    data = []
+    header = BytesIO()
+    _Pickler(header, data).dump(state)
+    header = header.getvalue()
+
+    data_length = sum(len(buffer) for buffer in data)
+    with open(path, 'wb') as f:
+        f.write(PREAMBLE.pack(MAGIC, PREAMBLE.size,
+            PREAMBLE.size + data_length, len(header)))
+        for buffer in data:
+            f.write(buffer)
+        f.write(header)
+
+
+def load(path):
+    '''Returns the state saved to the file path, see `save`.  The file is
+    memory mapped, and must not be modified while the state is in use.  The
+    state is unpickled, so only files from trusted sources should be loaded.
+    '''
+    with open(path, 'rb') as f:
+        preamble = f.read(PREAMBLE.size)
+        if len(preamble) != PREAMBLE.size \
+                or PREAMBLE.unpack(preamble)[0] != MAGIC:
+            raise ValueError(f'not a search index file: {path!r}')
+
+        # The memory map remains open while any array references it
+        _, data_offset, header_offset, header_length = \
+            PREAMBLE.unpack(preamble)
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    header = data[header_offset:header_offset + header_length]
+    return _Unpickler(BytesIO(header), data[data_offset:header_offset]).load()
+
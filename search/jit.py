@@ -0,0 +1,250 @@
+# jit.py
+#
+# Compiles a condition tree into specialized python source, which is then
+# compiled into a single function.  Attribute lookups, operators and the
+# conversion of the query value to common types are inlined into the
+# generated source, so evaluating an object requires far fewer python level
+# calls than interpreting the condition tree.
+import builtins
+import linecache
+import logging
+import operator
+from itertools import count
+
+from .conditions import (
+    AndStatement,
+    AnyExpression,
+    BooleanStatement,
+    Expression,
+    LikeExpression,
+    NotStatement,
+    OrStatement,
+)
+from .field import Field, literal_name
+
+logger = logging.getLogger(__name__)
+
+
+# Operators which are inlined into the generated source
+INLINE_OPERATORS = {
+    operator.eq: '==',
+    operator.ne: '!=',
+    operator.lt: '<',
+    operator.le: '<=',
+    operator.gt: '>',
+    operator.ge: '>=',
+}
+
+# Types whose converted query value is computed when the query is compiled
+INLINE_TYPES = (str, int, float)
+
+_counter = count()
+
+
+class CompiledQuery(object):
+    '''The result of compiling a condition tree.
+
+    Parameters:
+        function - the compiled function, which takes a single object and
+            returns a truthy value if the object matches the condition
+        source - the generated python source of function
+    '''
+    def __init__(self, function, source):
+        self.function = function
+        self.source = source
+
+    def __str__(self):
+        return self.source
+
+
+def compile_condition(condition):
+    '''Returns the CompiledQuery for condition.  The CompiledQuery is cached
+    for as long as condition is alive, so each condition is compiled once,
+    unless the statistics collected by its expressions change the order in
+    which the conditions should be evaluated.
+
+    The CompiledQuery is stored on the condition itself, rather than in a
+    cache keyed by the condition, as the generated function references the
+    predicates of conditions it does not inline, which may reference the
+    condition.  The reference cycle is freed with the condition.
+
+    Parameters:
+        condition - the condition tree to compile
+    '''
+    signature = _signature(condition)
+
+    cached_signature, compiled = getattr(
+        condition, '_compiled_query', (None, None))
+    if compiled is None or cached_signature != signature:
+        compiled = _CodeGenerator(condition).generate()
+        condition._compiled_query = (signature, compiled)
+    return compiled
+
+
+def _signature(condition):
+    '''Returns a value identifying the order in which the conditions of the
+    condition tree are evaluated.
+    '''
+    if isinstance(condition, BooleanStatement):
+        return tuple(_signature(c) for c in condition.ordered_conditions())
+    if isinstance(condition, NotStatement):
+        return (_signature(condition.condition),)
+    return id(condition)
+
+
+class _CodeGenerator(object):
+    '''Generates the python source for a condition tree'''
+
+    def __init__(self, condition):
+        self.condition = condition
+        self.namespace = {'__builtins__': builtins}
+        self.functions = []
+
+    def generate(self):
+        '''Generates, compiles and returns the CompiledQuery'''
+        body = self.visit(self.condition)
+
+        lines = []
+        for function in self.functions:
+            lines.extend(function)
+            lines.append('')
+        lines.append('def query(obj):')
+        lines.append(f'    return {body}')
+        source = '\n'.join(lines) + '\n'
+
+        # Register the source with linecache so tracebacks show the
+        # generated source
+        filename = f'<search-query-{next(_counter)}>'
+        linecache.cache[filename] = (
+            len(source), None, source.splitlines(True), filename)
+
+        exec(compile(source, filename, 'exec'), self.namespace)
+        logger.debug(f'Compiled {self.condition}:\n{source}')
+
+        return CompiledQuery(self.namespace['query'], source)
+
+    def constant(self, name, value):
+        '''Adds value to the generated function's namespace, returning the
+        name it is bound to.
+        '''
+        name = f'{name}{len(self.namespace)}'
+        self.namespace[name] = value
+        return name
+
+    def visit(self, condition):
+        '''Returns a python expression that evaluates condition for `obj`'''
+        if isinstance(condition, NotStatement):
+            return f'not {self.visit(condition.condition)}'
+
+        if isinstance(condition, (AndStatement, OrStatement)):
+            op = 'and' if isinstance(condition, AndStatement) else 'or'
+            body = f' {op} '.join(
+                self.visit(c) for c in condition.ordered_conditions())
+            return f'({body})'
+
+        if isinstance(condition, Expression):
+            return f'{self.expression(condition)}(obj)'
+
+        # Unknown condition types are evaluated by their own predicate
+        predicate = self.constant('_predicate', condition.predicate())
+        return f'{predicate}(obj)'
+
+    def expression(self, expression):
+        '''Generates a function evaluating expression, returning the name of
+        the generated function.
+        '''
+        field = expression.field
+        op_func = expression.EXPRESSION
+        name = f'_expression{len(self.functions)}'
+
+        op = self.constant('_op', op_func)
+        lines = [f'def {name}(obj):', f'    # {expression}']
+
+        # Nested fields are resolved by the field itself
+        if field.is_nested_type:
+            compare = self.constant('_compare', field.compare_value)
+            lines.append(f'    return {compare}(obj, {op})')
+            self.functions.append(lines)
+            return name
+
+        # Find the matching attribute value, inlining the lookup of literal
+        # names and the scan of dict keys
+        search = self.constant('_search', field.compile_regex(field.name).search)
+        lookup = self.constant('_lookup', field.lookup)
+        scan = [
+            'for key in obj:',
+            f'    if {search}(key):',
+            '        value = obj[key]',
+            '        break',
+            'else:',
+            '    return False',
+        ]
+
+        literal, exact = literal_name(field.name)
+        if literal is not None:
+            scan = [
+                f'if {literal!r} in obj:',
+                f'    value = obj[{literal!r}]',
+                'else:',
+            ] + (['    return False'] if exact else [f'    {l}' for l in scan])
+
+        lines.append('    if isinstance(obj, dict):')
+        lines.extend(f'        {line}' for line in scan)
+        lines.extend([
+            '    else:',
+            f'        value = {lookup}(obj)',
+        ])
+
+        # Special cases, the attribute value is None or empty string
+        convert = self.constant('_convert', field.convert)
+        lines.append('    if not value:')
+        if field.value in ('None', '.*'):
+            lines.extend([
+                '        if value is None:',
+                f'            return {op}(None, {convert}(type(None)))',
+            ])
+        if field.value in ('', '.*'):
+            lines.extend([
+                "        if value == '':",
+                f'            return {op}(value, {convert}(type(value)))',
+            ])
+        lines.append('        return False')
+
+        if isinstance(expression, AnyExpression):
+            lines.append('    return True')
+        else:
+            lines.append('    _type = type(value)')
+            for _type in INLINE_TYPES:
+                inlined = self.inline(expression, op_func, _type)
+                if inlined:
+                    lines.append(f'    if _type is {_type.__name__}:')
+                    lines.append(f'        return {inlined}')
+            lines.append(f'    return {op}(value, {convert}(_type))')
+
+        self.functions.append(lines)
+        return name
+
+    def inline(self, expression, op_func, _type):
+        '''Returns a python expression comparing `value`, of type _type, to
+        the query value, or None if the comparison cannot be inlined.
+        '''
+        converted = expression.field.convert(_type)
+        if converted is None:
+            return None
+
+        if isinstance(expression, LikeExpression):
+            if not isinstance(converted, str):
+                return None
+            if not converted:
+                return repr(converted)
+            try:
+                regex = Field.compile_regex(converted)
+            except Exception:
+                return None
+            search = self.constant('_like', regex.search)
+            return f'{search}(value) is not None'
+
+        if op_func not in INLINE_OPERATORS:
+            return None
+        return f'value {INLINE_OPERATORS[op_func]} ' \
+            f'{self.constant("_value", converted)}'
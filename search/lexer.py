@@ -1,48 +1,53 @@
+import copy
 import logging
 from ply import lex, yacc
 import re
+from threading import Lock
 
 from .conditions import *
+from .tokens import *
 
 logger = logging.getLogger(__name__)
 
-tokens = (
-    'NAME',
-    'EQUALS',
-    'NOT_EQUALS',
-    'LIKE', 'LT', 'GT', 'LTE', 'GTE',
-    'AND', 'OR',
-)
 
-literals = ['!', '(', ')']
+class ParseContext(object):
+    '''Holds the state of a single compile.  Each call to `compile` creates
+    its own context, which is attached to the lexer and parser used for that
+    compile, so concurrent compiles never share mutable state.
+    '''
+    def __init__(self):
+        self.has_error = False
 
-# Tokens
-t_NAME      = r'(\(\?[a-z]\)\s*)?[a-zA-Z0-9_\\.*\-\+\^\$/\|\[\]\{\}\,\?,@,\'"]+'
-t_LT        = r'\s*<\s*'
-t_LTE       = r'\s*<=\s*'
-t_GT        = r'\s*>\s*'
-t_GTE       = r'\s*>=\s*'
-t_EQUALS    = r'\s*=\s*'
-t_NOT_EQUALS = r'\s*!=\s*'
-t_AND       = r'((?i)\s+and\s+)|\s*&&\s*'
-t_OR        = r'((?i)\s+or\s+)|\s*\|\|\s*'
-t_LIKE      = r'(?i)\s+like\s+|\s*~\s*'
+    def lex_error(self, t):
+        '''Called by the lexer when an illegal character is found'''
+        logger.debug("Illegal character '{}' at pos {}".format(
+            t.value, t.lexpos+1))
+        self.has_error = True
 
+    def parse_error(self, p):
+        '''Called by the parser when a syntax error is found'''
+        if p:
+            logger.warning(
+                "Syntax error at '{}' at pos {}".format(p.value, p.lexpos + 1)
+            )
+        else:
+            logger.warning('An error occurred... not sure what')
+        self.has_error = True
 
-has_error = False
 
 def t_newline(t):
     r'\n+'
     t.lexer.lineno += t.value.count("\n")
 
 def t_error(t):
-    logger.debug("Illegal character '{}' at pos {}".format(
-        t.value, t.lexpos+1))
+    context = getattr(t.lexer, 'context', None)
+    if context is not None:
+        context.lex_error(t)
+    else:
+        logger.debug("Illegal character '{}' at pos {}".format(
+            t.value, t.lexpos+1))
     t.lexer.skip(1)
 
-    global has_error
-    has_error = True
-
 
 # Precedence rules for the arithmetic operators
 precedence = (
@@ -110,34 +115,64 @@ def p_statement_group(p):
     p[0] = p[2]
 
 def p_error(p):
-    if p:
+    # The default error handler, used by parsers not created by `compile`,
+    # which replaces it with the error handler of its ParseContext.  The error
+    # is flagged on the context of the token's lexer, if it has one.
+    context = getattr(getattr(p, 'lexer', None), 'context', None)
+    if context is not None:
+        context.parse_error(p)
+    elif p:
         logger.warning(
             "Syntax error at '{}' at pos {}".format(p.value, p.lexpos + 1)
         )
     else:
         logger.warning('An error occurred... not sure what')
 
-    global has_error
-    has_error = True
+# The lexer and parser are built once, on first use, and reused for every
+# subsequent compile.  Building either rebuilds PLY's tables, which is far
+# more expensive than parsing a query.  Each compile works on shallow copies,
+# which share the tables but not the parse state.
+_lexer = None
+_parser = None
+_build_lock = Lock()
+
+def _build():
+    global _lexer, _parser
+
+    if _parser is None:
+        with _build_lock:
+            if _parser is None:
+                _lexer = lex.lex()
+                _parser = yacc.yacc(debug=False, write_tables=False)
+    return _lexer, _parser
 
 def compile(query):
-    global has_error
+    '''Compiles a query string into a condition object.  This function is
+    reentrant and may be called from many threads simultaneously.
 
-    try:
-        lex.lex()
-        compiled_cond = yacc.yacc().parse(query)
-        return compiled_cond if not has_error else None
-    finally:
-        has_error = False
+    Parameters:
+        query - the query string to compile
+
+    Returns - the compiled condition if the query string is valid; otherwise
+        None.
+    '''
+    lexer, parser = _build()
+    context = ParseContext()
+
+    lexer = lexer.clone()
+    lexer.context = context
+
+    parser = copy.copy(parser)
+    parser.errorfunc = context.parse_error
+
+    compiled_cond = parser.parse(query, lexer=lexer)
+    return compiled_cond if not context.has_error else None
 
 if __name__ == '__main__':
     import sys
     if sys.version_info[0] >= 3:
         raw_input = input
 
-    lex.lex()
-    yacc.yacc()
-
     while True:
         try:
             s = input('search > ')   # use input() on Python 3
@@ -145,6 +180,6 @@ if __name__ == '__main__':
             break
         if s.lower().strip() == 'quit':
             exit(0)
-        result = yacc.parse(s)
+        result = compile(s)
         print(type(result))
         print(result)
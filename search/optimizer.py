@@ -0,0 +1,96 @@
+# optimizer.py
+#
+# Rewrites a compiled condition tree into an equivalent tree which is cheaper
+# to evaluate.  Every condition matches values one at a time, so the usual
+# boolean algebra identities hold and the rewritten tree always returns the
+# same results as the original tree.
+from .conditions import (
+    AndStatement,
+    BooleanStatement,
+    Expression,
+    NotStatement,
+    OrStatement,
+)
+
+
+# The statement produced when a NOT is pushed through a boolean statement,
+# using De Morgan's laws.  E.g. !(a and b) -> !a or !b
+DE_MORGAN = {
+    AndStatement: OrStatement,
+    OrStatement: AndStatement,
+}
+
+
+def optimize(condition):
+    '''Returns an optimized, but equivalent, copy of condition.  The original
+    condition is not modified.  The following rewrites are applied:
+
+    1) NOT statements are pushed down to the expressions using De Morgan's
+       laws and double negations are removed.  E.g. !(a or !b) -> !a and b
+    2) Nested AND / OR statements are flattened into a single statement.
+       E.g. (a and b) and c -> a and b and c
+    3) Duplicate conditions of an AND / OR statement are removed.
+       E.g. a or b or a -> a or b
+
+    Parameters:
+        condition - the condition tree to optimize
+
+    Returns - the optimized condition tree
+    '''
+    return _optimize(condition, negate=False)
+
+
+def _optimize(condition, negate):
+    '''Returns the optimized condition, negated if negate is True'''
+    if isinstance(condition, NotStatement):
+        return _optimize(condition.condition, not negate)
+
+    if isinstance(condition, BooleanStatement):
+        statement = type(condition)
+        if negate:
+            statement = DE_MORGAN[statement]
+
+        conditions = []
+        for child in condition.conditions:
+            child = _optimize(child, negate)
+
+            # Flatten statements of the same type into this statement
+            children = child.conditions if type(child) is statement else [child]
+            conditions.extend(children)
+
+        conditions = _remove_duplicates(conditions)
+        return statement(*conditions) if len(conditions) > 1 else conditions[0]
+
+    return NotStatement(condition) if negate else condition
+
+
+def _remove_duplicates(conditions):
+    '''Returns conditions, preserving order, with duplicate conditions removed.
+    Two conditions are duplicates if their keys, see `_key`, are equal.
+    '''
+    seen = set()
+    results = []
+    for condition in conditions:
+        key = _key(condition)
+        if key not in seen:
+            seen.add(key)
+            results.append(condition)
+    return results
+
+
+def _key(condition):
+    '''Returns a key of condition which is equal for conditions matching the
+    same values: the type, field name and value of expressions, as written in
+    the query, and the keys of the conditions of statements.  The string of a
+    condition is not used, as nested names which differ, e.g. `a.b` and
+    `a\\.b`, print the same.  Any other condition is only equal to itself.
+    '''
+    if isinstance(condition, Expression):
+        field = condition.field
+        return (type(condition), field.original_name, field.original_value)
+    if isinstance(condition, NotStatement):
+        return (NotStatement, _key(condition.condition))
+    if isinstance(condition, BooleanStatement):
+        return (type(condition),) \
+            + tuple(_key(c) for c in condition.conditions)
+    return condition
@@ -1,7 +1,14 @@
 # __init__.py
+from datetime import date
 
 PARSERS = {}
 
+
+def current_year():
+    '''Returns the year dates without a year default to'''
+    return date.today().year
+
+
 def register_parser(_type):
     def decorator(func):
         PARSERS[_type] = func
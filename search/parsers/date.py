@@ -1,8 +1,11 @@
 # date.py
 
-from datetime import date, datetime
+from datetime import date, datetime, time
+from functools import lru_cache
 import logging
+import re
 
+from .. import parsers
 from . import register_parser
 
 logger = logging.getLogger(__name__)
@@ -24,24 +27,156 @@ DATE_FORMATS = (
     '%y%m%d',
 )
 
-@register_parser(date)
-@register_parser(datetime)
-def Date(date_str):
-    '''Parse date in string format into a datetime object'''
-    if not date_str:
+# The maximum number of parsed strings to cache
+PARSER_CACHE_SIZE = 1024
+
+# The minimum and maximum number of digits matched by each strptime directive
+DIRECTIVE_LENGTHS = {
+    '%Y': (4, 4),
+    '%y': (2, 2),
+    '%m': (1, 2),
+    '%d': (1, 2),
+}
+
+_DATE_SHAPE_REGEX = re.compile(r'\d+(?:([-/])\d+)*$')
+_ISO_DATE_REGEX = re.compile(r'\d{4}-\d{2}-\d{2}$')
+_ISO_DATETIME_REGEX = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}')
+
+
+def _format_shape(format):
+    '''Returns a tuple of (separator, parts, min_length, max_length)
+    describing the strings format can match.
+    '''
+    separator = '-' if '-' in format else '/' if '/' in format else ''
+    directives = re.findall(r'%[a-zA-Z]', format)
+    parts = len(directives) if separator else 1
+
+    # Each separator adds a single character
+    min_length = sum(DIRECTIVE_LENGTHS[d][0] for d in directives) + parts - 1
+    max_length = sum(DIRECTIVE_LENGTHS[d][1] for d in directives) + parts - 1
+    return separator, parts, min_length, max_length
+
+
+_FORMAT_SHAPES = [(format, _format_shape(format)) for format in DATE_FORMATS]
+
+
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def candidate_formats(shape):
+    '''Returns the DATE_FORMATS, in order, which can match a string of shape
+
+    Parameters:
+        shape - a tuple of (separator, parts, length)
+    '''
+    separator, parts, length = shape
+    return tuple(
+        format for format, (_separator, _parts, min_length, max_length)
+        in _FORMAT_SHAPES
+        if (_separator, _parts) == (separator, parts)
+            and min_length <= length <= max_length
+    )
+
+
+def parse_date(date_str):
+    '''Parses date_str into a date, returning None if date_str is not a
+    date.  Canonical ISO 8601 dates are parsed using `date.fromisoformat`
+    and ISO 8601 datetimes are truncated to their date; otherwise only the
+    DATE_FORMATS matching the shape of date_str, its separator, number of
+    parts and length, are tried.  Formats without a year default to the
+    current year.  Results are cached per year.
+    '''
+    return _parse_date(date_str, parsers.current_year())
+
+
+def parse_datetime(datetime_str):
+    '''Parses datetime_str into a datetime, returning None if datetime_str
+    is not a date or datetime.  ISO 8601 datetimes are parsed using
+    `datetime.fromisoformat`, preserving the time; dates are parsed by
+    `parse_date` and converted to a datetime at midnight.  Results are cached
+    per year.
+    '''
+    return _parse_datetime(datetime_str, parsers.current_year())
+
+
+def clear_cache():
+    '''Clears the cached results of `parse_date` and `parse_datetime`'''
+    _parse_date.cache_clear()
+    _parse_datetime.cache_clear()
+
+
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def _parse_date(date_str, year):
+    '''Returns date_str parsed into a date, see `parse_date`, defaulting to
+    year.  The year is part of the cache key, so dates without a year are not
+    cached past the end of the year.
+    '''
+    if _ISO_DATE_REGEX.match(date_str):
+        try:
+            return date.fromisoformat(date_str)
+        except ValueError:
+            return None
+
+    # Compare dates to the date of a datetime
+    if _ISO_DATETIME_REGEX.match(date_str):
+        parsed = _parse_datetime(date_str, year)
+        return parsed.date() if parsed else None
+
+    match = _DATE_SHAPE_REGEX.match(date_str)
+    if not match:
         return None
 
-    for format in DATE_FORMATS:
+    separator = match.group(1) or ''
+    parts = date_str.count(separator) + 1 if separator else 1
+
+    for format in candidate_formats((separator, parts, len(date_str))):
         try:
             formatted = datetime.strptime(date_str, format)
+        except ValueError:
+            continue
 
-            if formatted.year == 1900:
-                formatted = datetime(
-                    year=datetime.now().year,
-                    month=formatted.month,
-                    day=formatted.day)
-            return formatted.date()
+        # strptime defaults the year to 1900
+        if '%Y' not in format and '%y' not in format:
+            formatted = datetime(
+                year=year,
+                month=formatted.month,
+                day=formatted.day)
+        return formatted.date()
+    return None
+
+
+@lru_cache(maxsize=PARSER_CACHE_SIZE)
+def _parse_datetime(datetime_str, year):
+    '''Returns datetime_str parsed into a datetime, see `parse_datetime`,
+    defaulting to year
+    '''
+    if _ISO_DATETIME_REGEX.match(datetime_str):
+        try:
+            return datetime.fromisoformat(datetime_str)
         except ValueError:
-            pass
+            return None
+
+    parsed = _parse_date(datetime_str, year)
+    return datetime.combine(parsed, time()) if parsed else None
+
+
+@register_parser(date)
+def Date(date_str):
+    '''Parse date in string format into a date object'''
+    if not date_str:
+        return None
+
+    parsed = parse_date(date_str)
+    if parsed is None:
+        logger.error("Failed to parse date '{}'".format(date_str))
+    return parsed
+
+
+@register_parser(datetime)
+def DateTime(datetime_str):
+    '''Parse date, or datetime, in string format into a datetime object'''
+    if not datetime_str:
+        return None
 
-    logger.error("Failed to parse date '{}'".format(date_strs))
\ No newline at end of file
+    parsed = parse_datetime(datetime_str)
+    if parsed is None:
+        logger.error("Failed to parse datetime '{}'".format(datetime_str))
+    return parsed
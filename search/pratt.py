@@ -0,0 +1,197 @@
+# pratt.py
+#
+# A dependency free Pratt (top down operator precedence) parser for the search
+# grammar.  The parser produces exactly the same condition trees as the PLY
+# grammar defined in `search.lexer`, but avoids importing PLY and building its
+# tables, and tokenizes using a single precompiled regular expression.
+import logging
+import re
+
+from . import tokens as _tokens
+from .conditions import (
+    AndStatement,
+    AnyExpression,
+    EqualExpression,
+    GreaterThanExpression,
+    GreaterThanOrEqualExpression,
+    LessThanExpression,
+    LessThanOrEqualExpression,
+    LikeExpression,
+    NotEqualExpression,
+    NotStatement,
+    OrStatement,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _build_master_regex():
+    '''Builds a single regular expression matching every token.  Token rules
+    are ordered the same way PLY orders them, longest regular expression
+    first, so both engines tokenize identically.
+    '''
+    rules = [
+        (name[2:], regex) for name, regex in vars(_tokens).items()
+        if name.startswith('t_') and isinstance(regex, str)
+    ]
+    rules.sort(key=lambda rule: len(rule[1]), reverse=True)
+    rules.insert(0, ('NEWLINE', r'\n+'))
+
+    return re.compile('|'.join(f'(?P<{name}>{regex})' for name, regex in rules))
+
+_MASTER_REGEX = _build_master_regex()
+_LITERALS = frozenset(_tokens.literals)
+
+EOF = 'EOF'
+
+COMPARISONS = {
+    'EQUALS': EqualExpression,
+    'NOT_EQUALS': NotEqualExpression,
+    'LIKE': LikeExpression,
+    'LT': LessThanExpression,
+    'LTE': LessThanOrEqualExpression,
+    'GT': GreaterThanExpression,
+    'GTE': GreaterThanOrEqualExpression,
+}
+
+STATEMENTS = {
+    'AND': AndStatement,
+    'OR': OrStatement,
+}
+
+# Binding powers.  AND and OR share the same precedence and are left
+# associative, NOT binds tighter than both.
+STATEMENT_BINDING_POWER = 10
+NOT_BINDING_POWER = 20
+
+
+class ParseError(Exception):
+    '''Raised when the query string is not a valid query'''
+    pass
+
+
+def tokenize(query):
+    '''Splits a query string into a list of (type, value, pos) tuples,
+    terminated by an EOF token.
+
+    Raises - ParseError if the query contains an illegal character
+    '''
+    results = []
+    pos = 0
+    length = len(query)
+
+    while pos < length:
+        match = _MASTER_REGEX.match(query, pos)
+        if match:
+            if match.lastgroup != 'NEWLINE':
+                results.append((match.lastgroup, match.group(), pos))
+            pos = match.end()
+        elif query[pos] in _LITERALS:
+            results.append((query[pos], query[pos], pos))
+            pos += 1
+        else:
+            logger.debug("Illegal character '{}' at pos {}".format(
+                query[pos:], pos+1))
+            raise ParseError(query[pos:])
+
+    results.append((EOF, '', length))
+    return results
+
+
+class PrattParser(object):
+    '''Parses a list of tokens into a condition tree.
+
+    Parameters:
+        tokens - a list of tokens, as returned by `tokenize`
+    '''
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def parse(self):
+        '''Returns the condition tree for the complete token list.
+
+        Raises - ParseError if the tokens are not a valid query
+        '''
+        condition = self.expression()
+        self.expect(EOF)
+        return condition
+
+    def expression(self, binding_power=0):
+        '''Parses an expression, consuming statements whose binding power is
+        greater than binding_power.
+        '''
+        left = self.prefix()
+
+        while self.peek() in STATEMENTS \
+                and STATEMENT_BINDING_POWER > binding_power:
+            statement = STATEMENTS[self.next()[0]]
+            left = statement(left, self.expression(STATEMENT_BINDING_POWER))
+        return left
+
+    def prefix(self):
+        '''Parses a name, comparison, grouped expression or NOT statement'''
+        _type, value, _ = self.next()
+
+        if _type == 'NAME':
+            if self.peek() in COMPARISONS:
+                expression = COMPARISONS[self.next()[0]]
+                return expression(value, self.expect('NAME'))
+            return AnyExpression(value)
+
+        if _type == '(':
+            condition = self.expression()
+            self.expect(')')
+            return condition
+
+        if _type == '!':
+            return NotStatement(self.expression(NOT_BINDING_POWER))
+
+        self.pos -= 1
+        self.error()
+
+    def peek(self):
+        '''Returns the type of the next token, without consuming it'''
+        return self.tokens[self.pos][0]
+
+    def next(self):
+        '''Consumes and returns the next token'''
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, _type):
+        '''Consumes the next token, returning its value, if it is of the
+        expected type.
+
+        Raises - ParseError if the next token is not of the expected type
+        '''
+        if self.peek() != _type:
+            self.error()
+        return self.next()[1]
+
+    def error(self):
+        '''Logs a syntax error at the next token and raises ParseError'''
+        _type, value, pos = self.tokens[self.pos]
+        if _type != EOF:
+            logger.warning(
+                "Syntax error at '{}' at pos {}".format(value, pos + 1))
+        else:
+            logger.warning('An error occurred... not sure what')
+        raise ParseError(value)
+
+
+def compile(query):
+    '''Compiles a query string into a condition object.  This function is
+    reentrant and may be called from many threads simultaneously.
+
+    Parameters:
+        query - the query string to compile
+
+    Returns - the compiled condition if the query string is valid; otherwise
+        None.
+    '''
+    try:
+        return PrattParser(tokenize(query)).parse()
+    except ParseError:
+        return None
@@ -1,7 +1,47 @@
 # query.py
+import random
+import re
+
+from . import bitmap
+from .cache import LRUCache
 from .decorators import validate_query
 from .exceptions import InvalidQueryError
-from .lexer import compile
+from .indexes import SearchIndex
+from .jit import compile_condition
+from .optimizer import optimize as optimize_condition
+
+
+DEFAULT_QUERY_CACHE_SIZE = 1024
+
+# Parser engines used to compile query strings.  Both engines produce
+# identical condition trees:
+#   ply   - the PLY (lex/yacc) grammar defined in search.lexer
+#   pratt - the dependency free Pratt parser defined in search.pratt
+PARSER_ENGINES = ('ply', 'pratt')
+DEFAULT_PARSER = 'ply'
+
+# Execution engines used to evaluate compiled queries:
+#   tree      - each condition evaluates a bitmap of candidate positions and
+#               conditions are combined using bitwise operations, see
+#               search.bitmap.  Results preserve input order and duplicates.
+#   predicate - the condition tree is compiled into a single short-circuiting
+#               predicate, evaluated once per value in a single pass.  Results
+#               preserve input order and duplicates.
+#   jit       - same as predicate, but the predicate is generated python
+#               source, see search.jit
+EXECUTION_ENGINES = ('tree', 'predicate', 'jit')
+DEFAULT_ENGINE = 'tree'
+
+# Process wide cache of compiled conditions, keyed by the parser engine and
+# the normalized query string.  Compiled conditions are shared between Query
+# objects, and threads, without locking.  The only state they mutate is the
+# statistics collected by their expressions, which are approximate when a
+# condition is evaluated by multiple threads, and the order in which the
+# conditions of a statement are evaluated, which is derived from them.
+# Conditions are only reordered if none may raise, see Condition.may_raise,
+# so the results of a query are the same regardless of the statistics
+# collected, or of the queries executed concurrently.
+QUERY_CACHE = LRUCache(maxsize=DEFAULT_QUERY_CACHE_SIZE)
 
 
 class Query(object):
@@ -11,11 +51,23 @@ class Query(object):
     Parameters:
         query_str - a string representing the query used to search subsequent
             collections
+        parser - the parser engine used to compile query_str, one of
+            PARSER_ENGINES
+        engine - the execution engine used to evaluate the query, one of
+            EXECUTION_ENGINES
+        optimize - a bool indicating whether to optimize the compiled query,
+            see search.optimizer
     '''
-    def __init__(self, query_str):
+    def __init__(self, query_str, parser=DEFAULT_PARSER, engine=DEFAULT_ENGINE,
+            optimize=True):
+        assert engine in EXECUTION_ENGINES, \
+            f'engine must be one of {EXECUTION_ENGINES}: actual {engine!r}'
+
         query_str = query_str.strip()
 
         self.__condition = None
+        self.__engine = engine
+        self.__predicate = None
 
         # If the query string is empty, None, or equal to '*',
         # leave __condition unset, which will result is returning
@@ -25,7 +77,7 @@ class Query(object):
         # validate and compile the query string.
         if not (not query_str or query_str == '*'):
             # compile the query string into a condition object
-            self.__condition = compile(query_str)
+            self.__condition = compile_query(query_str, parser, optimize)
 
             # if condition is none, the query string is invalid,
             # raise exception
@@ -46,30 +98,97 @@ class Query(object):
         if not self.__condition:
             return values
 
-        # Iterate through the set of values and convert any non-hashable values
-        # to hashable values.
-        hashable_values = []
+        if self.__engine in ('predicate', 'jit'):
+            return self.__evaluate_predicate(values)
+
+        # Evaluate the condition against every position of values, then map
+        # the resulting bitmap back to the matching values.  Expressions
+        # resolve positions using the indexes of a SearchIndex.
+        if not isinstance(values, (list, tuple, SearchIndex)):
+            values = list(values)
+        results = self.__condition(values, bitmap.full(len(values)))
+        return [values[position] for position in bitmap.iter_positions(results)]
+
+    def iter(self, values):
+        '''Returns a generator that lazily yields the elements of values
+        that match the query, in input order, including duplicates.  Values
+        may be any iterable, including unbounded generators, and are never
+        held in memory.  The tree engine evaluates the query using the
+        predicate engine.
+
+        Parameters:
+        values - an iterable of elements to search
+        '''
+        if not self.__condition:
+            yield from values
+            return
+
+        predicate = self.__get_predicate()
         for value in values:
-            if isinstance(value, (list, dict)):
-                hashable_values.append(HashableWrapperObject(value))
-            else:
-                hashable_values.append(value)
-
-        # Convert hashable_values to a set then execute the condition
-        results = self.__condition(set(hashable_values))
-
-        # Iterate through the results and convert all values back to their
-        # original form
-        converted_results = []
-        for result in results:
-            if isinstance(result, HashableWrapperObject):
-                converted_results.append(result._original_object)
-            else:
-                converted_results.append(result)
-
-        # Return the converted set of results, which includes non-hashable
-        # values
-        return converted_results
+            if predicate(value):
+                yield value
+
+    def __get_predicate(self):
+        '''Returns the predicate used by the predicate and jit engines'''
+        if self.__predicate is None:
+            self.__predicate = compile_condition(self.__condition).function \
+                if self.__engine == 'jit' \
+                else self.__condition.predicate()
+        return self.__predicate
+
+    def __evaluate_predicate(self, values):
+        '''Evaluates the query using the predicate engine, returning the
+        matching values in input order.
+        '''
+        predicate = self.__get_predicate()
+        return [value for value in values if predicate(value)]
+
+    def explain(self):
+        '''Returns a string describing how the query is evaluated: the
+        compiled query, the execution engine and, for the jit engine, the
+        generated python source.
+        '''
+        lines = [str(self), f'ENGINE: {self.__engine}']
+        if self.__condition and self.__engine == 'jit':
+            lines.append(compile_condition(self.__condition).source)
+
+        for expression, statistics in self.statistics():
+            lines.append(f'{expression}: {statistics}')
+        return '\n'.join(lines)
+
+    def statistics(self):
+        '''Returns a list of (expression, statistics) tuples, one for each
+        expression in the query, ordered by the total time spent evaluating
+        the expression, most expensive first.  Statistics are collected each
+        time the query is executed by the tree engine, or by
+        `collect_statistics`, and are used to order the conditions of AND and
+        OR statements.  Note: statistics are shared by all queries compiled
+        from the same query string.
+        '''
+        if not self.__condition:
+            return []
+
+        results = [(str(e), e.statistics) for e in self.__condition.expressions()]
+        return sorted(results, key=lambda r: r[1].elapsed, reverse=True)
+
+    def collect_statistics(self, values, sample_size=1000):
+        '''Collects statistics by evaluating every expression of the query
+        against a random sample of values.  This is useful to order the
+        conditions of a query before it is executed by the predicate or jit
+        engines, which do not collect statistics.
+
+        Parameters:
+            values - a collection of elements to sample
+            sample_size - the maximum number of elements to sample
+        '''
+        if not self.__condition:
+            return
+
+        values = values if isinstance(values, (list, tuple)) else list(values)
+        sample = random.sample(values, min(sample_size, len(values)))
+
+        for expression in self.__condition.expressions():
+            expression(sample, bitmap.full(len(sample)))
 
     def __str__(self):
         '''Returns a string representing the compiled query.'''
@@ -77,22 +196,86 @@ class Query(object):
     __repr__ = __str__
 
 
-class HashableWrapperObject:
-    '''Wrapper object for non-hashable objects.'''
-    def __init__(self, value):
-        if isinstance(value, list):
-            value = {str(k):v for k,v in enumerate(value)}
+def normalize_query(query_str):
+    '''Normalizes a query string so equivalent queries share a single cache
+    entry.  Leading and trailing whitespace is removed and runs of whitespace
+    are collapsed into a single space.  Newlines are preserved as they are
+    significant to the lexer.
+    '''
+    return re.sub(r'[^\S\n]+', ' ', query_str.strip())
 
-        for k, v in value.items():
-            setattr(self, k, v)
-        self._original_object = value
 
-    def __str__(self):
-        return str(self._original_object)
+def get_compiler(parser):
+    '''Returns the compile function for the parser engine.  Engines are
+    imported on first use, so PLY is only imported when the ply engine is used.
+
+    Parameters:
+        parser - the name of the parser engine, one of PARSER_ENGINES
+    '''
+    assert parser in PARSER_ENGINES, \
+        f'parser must be one of {PARSER_ENGINES}: actual {parser!r}'
+
+    if parser == 'pratt':
+        from .pratt import compile
+    else:
+        from .lexer import compile
+    return compile
+
+
+def compile_query(query_str, parser=DEFAULT_PARSER, optimize=True):
+    '''Compiles a query string into a condition object, using the process
+    wide query cache.  If the query string was previously compiled, the cached
+    condition is returned.
+
+    Parameters:
+        query_str - the query string to compile
+        parser - the parser engine used to compile query_str, one of
+            PARSER_ENGINES
+        optimize - a bool indicating whether to optimize the compiled
+            condition, see search.optimizer
+
+    Returns - the compiled condition if the query string is valid; otherwise
+        None.  Invalid query strings are not cached.
+    '''
+    normalized = normalize_query(query_str)
+    key = (parser, optimize, normalized)
+
+    condition = QUERY_CACHE.get(key)
+    if condition is None:
+        condition = get_compiler(parser)(normalized)
+
+        if condition is not None and optimize:
+            condition = optimize_condition(condition)
+
+        if condition is not None:
+            QUERY_CACHE.put(key, condition)
+    return condition
+
+
+def set_query_cache_size(maxsize):
+    '''Sets the maximum number of compiled queries to cache.  If maxsize is
+    None the cache is unbounded; if maxsize is 0 caching is disabled.
+    '''
+    QUERY_CACHE.maxsize = maxsize
+
+
+def query_cache_info():
+    '''Returns a CacheInfo containing the hits, misses, evictions, maxsize
+    and current size of the query cache.
+    '''
+    return QUERY_CACHE.info()
+
+
+def clear_query_cache():
+    '''Removes all compiled queries from the query cache and resets its
+    statistics.
+    '''
+    QUERY_CACHE.clear()
 
 
 @validate_query
-def search(search_str, values, dry_run=False):
+def search(search_str, values, dry_run=False, parser=DEFAULT_PARSER,
+        engine=DEFAULT_ENGINE, optimize=True):
     '''Searches a collection of, potentially, unlike python objects based on 
     the search string
 
@@ -102,13 +285,20 @@ def search(search_str, values, dry_run=False):
     dry_run - a bool indicating whether to compile the query only, but not
         execute it.  If True, the query will be return in string form.
         This is helpful to validate the search is being compiled correctly.
+        Note: the returned query is the optimized query, unless optimize is
+        False.
+    parser - the parser engine used to compile search_str, one of
+        PARSER_ENGINES
+    engine - the execution engine used to evaluate the query, one of
+        EXECUTION_ENGINES
+    optimize - a bool indicating whether to optimize the compiled query
 
     Returns - a subset, as a list, of objects from value that match the search
     '''
     assert isinstance(search_str, str), \
         f'search_str must be of type string: actual {type(search_str)}'
 
-    query = Query(search_str)
+    query = Query(search_str, parser, engine, optimize)
 
     if dry_run:
         return str(query)
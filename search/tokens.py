@@ -0,0 +1,26 @@
+# tokens.py
+#
+# Token definitions shared by the PLY lexer (`search.lexer`) and the Pratt
+# parser (`search.pratt`).  This module must not import PLY.
+
+tokens = (
+    'NAME',
+    'EQUALS',
+    'NOT_EQUALS',
+    'LIKE', 'LT', 'GT', 'LTE', 'GTE',
+    'AND', 'OR',
+)
+
+literals = ['!', '(', ')']
+
+# Tokens
+t_NAME      = r'(\(\?[a-z]\)\s*)?[a-zA-Z0-9_\\.*\-\+\^\$/\|\[\]\{\}\,\?,@,\'":]+'
+t_LT        = r'\s*<\s*'
+t_LTE       = r'\s*<=\s*'
+t_GT        = r'\s*>\s*'
+t_GTE       = r'\s*>=\s*'
+t_EQUALS    = r'\s*=\s*'
+t_NOT_EQUALS = r'\s*!=\s*'
+t_AND       = r'(?i:\s+and\s+)|\s*&&\s*'
+t_OR        = r'(?i:\s+or\s+)|\s*\|\|\s*'
+t_LIKE      = r'(?i:\s+like\s+)|\s*~\s*'
@@ -1,4 +1,8 @@
 # compile_perf_tests.py
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import sys
+import time
 import timeit
 
 from .. import logger, test
@@ -25,6 +29,85 @@ def perf_complex_compile_test():
     _log_results(total_time)
 
 
+@test
+def perf_uncached_compile_test():
+    total_time = timeit.timeit(
+        "compile(\"foo=bar and (!(foo like bar or x) or name ='Tom')\")",
+        setup="from search.lexer import compile",
+        number=ITERATIONS) * 1000
+    _log_results(total_time)
+
+
+@test
+def perf_threaded_compile_test():
+    from search.lexer import compile
+
+    threads = 8
+    queries = [
+        f"foo{i}=bar and (!(foo like bar{i} or x) or name ='Tom{i % 7}')"
+        for i in range(ITERATIONS)
+    ]
+
+    start_time = time.time()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(compile, queries))
+    total_time = (time.time() - start_time) * 1000
+
+    # Validate no compile was affected by compiles running on other threads
+    for query, result in zip(queries, results):
+        assert str(result) == str(compile(query)), \
+            f'Unexpected result for {query!r}: {result}'
+
+    logger.info(f"{'threads':>{PADDING}}: {threads:>15,}")
+    _log_results(total_time)
+
+
+SIMPLE_QUERIES = [
+    'foo=bar',
+    'x != 3',
+    'name like (?i)mike',
+    'x = 1 and y <= 5',
+    '!!x=2',
+]
+
+NESTED_QUERIES = [
+    '(' * 10 + 'x = 1' + ' and y > 2)' * 10,
+    ' or '.join(f'!(a{i} = {i} and (b{i} like c{i} || d{i}))' for i in range(10)),
+    "foo=bar and (!(foo like bar or x) or name ='Tom') and " * 5 + 'z',
+]
+
+
+@test
+def perf_parser_engines_compile_test():
+    for name, corpus in [('simple', SIMPLE_QUERIES), ('nested', NESTED_QUERIES)]:
+        for parser in ['ply', 'pratt']:
+            total_time = timeit.timeit(
+                'for query in corpus: compile(query)',
+                setup=f'from search.query import get_compiler\n'
+                      f'compile = get_compiler({parser!r})',
+                globals={'corpus': corpus},
+                number=ITERATIONS // len(corpus)) * 1000
+
+            logger.info(f"{'engine':>{PADDING}}: {parser + ' ' + name:>15}")
+            _log_results(total_time)
+
+
+@test
+def perf_parser_engines_cold_start_test():
+    statements = {
+        'ply': 'from search.lexer import _build; _build()',
+        'pratt': 'import search.pratt',
+    }
+
+    for parser, statement in statements.items():
+        start_time = time.time()
+        subprocess.run([sys.executable, '-c', statement], check=True)
+        total_time = (time.time() - start_time) * 1000
+
+        logger.info(f"{'engine':>{PADDING}}: {parser:>15}")
+        logger.info(f"{'cold start':>{PADDING}}: {total_time:>12,.2f} ms")
+
+
 def _log_results(total_time):
     suffix = 'ms'
     iter_suffix = 'ms'
@@ -72,4 +72,65 @@ results = search('person.name = Mike', values)
 assert len(results) == {0}
 """.format(int(count * 2))
 
-    run_perf_test(iterations, count * 6, setup_str, statement)
\ No newline at end of file
+    run_perf_test(iterations, count * 6, setup_str, statement)
+
+@test
+def perf_execution_large_expensive_properties_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = """
+from search import search
+
+def make_property(i):
+    def getter(self):
+        # An expensive, computed, property
+        return sum(range(100)) + i
+    return property(getter)
+
+ExpensiveObject = type('ExpensiveObject', (object,), {{
+    f'computed{{i}}': make_property(i) for i in range(30)
+}})
+
+values = []
+for i in range({0}):
+    value = ExpensiveObject()
+    value.name = 'Mike' if i % 2 else 'Tom'
+    values.append(value)
+""".format(count)
+
+    statement = """
+results = search('name = Mike', values)
+assert len(results) == {0}
+""".format(count // 2)
+
+    run_perf_test(iterations, count, setup_str, statement)
+
+
+@test
+def perf_execution_large_deep_NestedTestObject_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = """
+from search import search
+from search.unittests.testobject import NestedTestObject
+
+# Every level has 30 attributes, in addition to the nested attribute
+attributes = {{f'attr{{i}}': i for i in range(30)}}
+
+def make_value(i):
+    value = NestedTestObject(**attributes, e=i % 2)
+    for name in 'dcba':
+        value = NestedTestObject(**attributes, **{{name: value}})
+    return value
+
+values = [make_value(i) for i in range({0})]
+""".format(count)
+
+    statement = """
+results = search('a.b.c.d.e = 1', values)
+assert len(results) == {0}
+""".format(count // 2)
+
+    run_perf_test(iterations, count, setup_str, statement)
@@ -1,6 +1,6 @@
 # execution_perf_tests.py
 from .utils import run_perf_test
-from .. import test
+from .. import logger, test
 
 TEST_QUERY = 'fo=bar and !(x=2 and y = 3)'
 
@@ -60,4 +60,84 @@ def perf_execution_equality_and_equality_large_test():
         count * 6,
         setup=BUILTIN_OBJECT_SETUP.format(count),
         statement=BUILTIN_STATEMENT.format(count)
-    )
\ No newline at end of file
+    )
+
+MULTI_CLAUSE_QUERY = 'x = 3 and y = 2 and foo = gurp and name like M.* and !z'
+
+MULTI_CLAUSE_SETUP = """
+from search import search
+values=[
+    {{'x': 1, 'y': 2, 'foo': 3}},
+    dict(x=1, y=2, foo='bar'),
+    dict(x='3', y=2, foo='gurp', name='Mike'),
+    dict(x=3, y=2, foo='gurp', name='Tom'),
+    [1,2,3,4],
+    {{'name': 'Mike', 'fo0d': 'bar'}},
+]*{0}
+"""
+
+MULTI_CLAUSE_STATEMENT = f"""
+results = search('{MULTI_CLAUSE_QUERY}', values, engine={{1!r}})
+assert len(results) == {{0}}, len(results)
+"""
+
+
+@test
+def perf_execution_multi_clause_engines_test():
+    iterations = 10
+    count = 10000
+
+    for engine in ['tree', 'predicate', 'jit']:
+        logger.info(f"{'Engine':>25}: {engine:>10}")
+        run_perf_test(
+            iterations,
+            count * 6,
+            setup=MULTI_CLAUSE_SETUP.format(count),
+            statement=MULTI_CLAUSE_STATEMENT.format(count, engine)
+        )
+
+
+SELECTIVE_AND_SETUP = """
+from search import search
+values = [dict(id=i, name=f'name{{i}}', foo='bar') for i in range(1, {0} + 1)]
+"""
+
+SELECTIVE_AND_STATEMENT = """
+results = search('id = 123 and name like ^name1 and !foo = gurp', values)
+assert len(results) == 1, len(results)
+"""
+
+
+@test
+def perf_execution_selective_and_test():
+    iterations = 10
+    count = 100000
+
+    run_perf_test(
+        iterations,
+        count,
+        setup=SELECTIVE_AND_SETUP.format(count),
+        statement=SELECTIVE_AND_STATEMENT
+    )
+
+
+REORDER_STATEMENT = """
+results = search('name != name7 and foo != gurp and id = 123', values)
+assert len(results) == 1, len(results)
+"""
+
+
+@test
+def perf_execution_cost_based_order_test():
+    iterations = 10
+    count = 100000
+
+    # The first iteration collects statistics, subsequent iterations
+    # evaluate the selective equality first.  Only conditions which can not
+    # raise are reordered, see Condition.may_raise
+    run_perf_test(
+        iterations,
+        count,
+        setup=SELECTIVE_AND_SETUP.format(count),
+        statement=REORDER_STATEMENT
+    )
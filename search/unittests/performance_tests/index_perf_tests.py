@@ -0,0 +1,252 @@
+# index_perf_tests.py
+from .utils import run_perf_test
+from .. import test
+
+
+LARGE_TEST_COUNT = 100000
+LARGE_TEST_ITERATION = 10
+
+SETUP = """
+from search import search, SearchIndex
+from search.unittests.testobject import TestObject
+
+values = []
+
+for i in range({0}):
+    values.extend([
+        TestObject(**{{'x': 1, 'y': 2, 'foo': 3}}),
+        TestObject(**dict(x=1, y=2, foo='bar')),
+        TestObject(**dict(x='3', y=2, foo='gurp')),
+        TestObject(**dict(x=3, y=2, foo='gurp')),
+        TestObject(**{{'name': 'Mike', 'fo0d': 'bar'}}),
+        TestObject(**{{'name': f'Mike{{i}}', 'foo': 'bar'}}),
+    ])
+"""
+
+
+@test
+def perf_execution_large_hash_index_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = SETUP.format(count) + """
+values = SearchIndex(values, fields=('name',))
+"""
+
+    statement = """
+results = search('name = Mike', values)
+assert len(results) == {0}
+
+results = search('name = Mike7', values)
+assert len(results) == 1
+""".format(count)
+
+    run_perf_test(iterations, count * 6, setup_str, statement)
+
+
+@test
+def perf_execution_large_hash_index_build_test():
+    iterations = 1
+    count = LARGE_TEST_COUNT
+
+    statement = """
+SearchIndex(values, fields=('name',))
+"""
+
+    run_perf_test(iterations, count * 6, SETUP.format(count), statement)
+
+
+@test
+def perf_execution_large_range_index_test():
+    iterations = LARGE_TEST_ITERATION
+    count = 730 * 1000  # 1,000 values per day, for 2 years
+
+    setup_str = """
+from datetime import date, timedelta
+from search import search, SearchIndex
+
+start = date(2025, 1, 1)
+values = [dict(date=start + timedelta(days=i % 730), id=i) for i in range({0})]
+values = SearchIndex(values)
+values.create_index('date', kind='range')
+""".format(count)
+
+    statement = """
+results = search('date >= 2026-01-01 and date < 2026-02-01', values)
+assert len(results) == {0}
+""".format(count * 31 // 730)
+
+    run_perf_test(iterations, count, setup_str, statement)
+
+
+@test
+def perf_execution_large_ngram_index_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = """
+import random
+from search import search, SearchIndex
+
+random.seed(0)
+words = ['timeout', 'error', 'connection', 'refused', 'user', 'login',
+    'failed', 'ok', 'request', 'served', 'GET', 'POST', '/api/items']
+values = [dict(message=' '.join(random.choices(words, k=8)) + f' id:{{i}}')
+    for i in range({0})]
+
+expected = len(search('message like connection.refused', values))
+values = SearchIndex(values)
+values.create_index('message', kind='ngram')
+""".format(count)
+
+    statement = """
+results = search('message like connection.refused', values)
+assert len(results) == expected
+
+results = search('message like id:12345$', values)
+assert len(results) == 1
+"""
+
+    run_perf_test(iterations, count, setup_str, statement)
+
+
+@test
+def perf_execution_large_name_index_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = """
+import random
+from search import search, SearchIndex
+from search.unittests.testobject import TestObject
+
+# 200 distinct attribute names, 10 per object
+random.seed(0)
+names = [f'attr{{i}}' for i in range(200)]
+values = []
+for i in range({0}):
+    attributes = dict.fromkeys(random.sample(names, 10), 1)
+    values.append(attributes if i % 2 else TestObject(**attributes))
+
+expected = len(search('attr7 and !attr150', values))
+values = SearchIndex(values, names=True)
+""".format(count)
+
+    statement = """
+results = search('attr7 and !attr150', values)
+assert len(results) == expected
+"""
+
+    run_perf_test(iterations, count, setup_str, statement)
+
+
+@test
+def perf_execution_large_search_index_changes_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    # An inventory where 1% of the items change between queries
+    setup_str = """
+import random
+from search import search, SearchIndex
+
+random.seed(0)
+statuses = ['in stock', 'backordered', 'discontinued']
+values = [dict(sku=f'sku{{i}}', qty=random.randrange(100),
+    status=random.choice(statuses)) for i in range({0})]
+values = SearchIndex(values, fields=('sku', 'status'))
+values.create_index('qty', kind='range')
+skus = {0}
+""".format(count)
+
+    statement = """
+for _ in range({0}):
+    value = values[random.randrange(len(values))]
+    value['qty'] = random.randrange(100)
+    value['status'] = random.choice(statuses)
+    values.update(value)
+
+for _ in range({1}):
+    values.remove(values[random.randrange(len(values))])
+    values.add(dict(sku=f'sku{{skus}}', qty=0, status='backordered'))
+    skus += 1
+
+results = search('status = backordered and qty < 10', values)
+results = search('sku = sku12345', values)
+""".format(count // 100, count // 1000)
+
+    run_perf_test(iterations, count, setup_str, statement)
+
+
+@test
+def perf_execution_large_search_index_load_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = SETUP.format(count) + """
+import os, tempfile
+
+path = os.path.join(tempfile.mkdtemp(), 'index')
+index = SearchIndex(values, fields=('name', 'foo'), names=True)
+index.create_index('x', kind='range')
+index.save(path)
+"""
+
+    statement = """
+index = SearchIndex.load(path, values)
+results = search('name = Mike7', index)
+assert len(results) == 1
+"""
+
+    run_perf_test(iterations, count * 6, setup_str, statement)
+
+
+@test
+def perf_execution_large_index_advisor_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = SETUP.format(count) + """
+values = SearchIndex(values)
+search('name = Mike7', values)
+search('x > 1', values)
+search('foo like ^gu', values)
+"""
+
+    statement = """
+recommendations = values.advisor.recommend(memory_budget=64 * 1024 * 1024)
+assert len(recommendations) == 3
+"""
+
+    run_perf_test(iterations, count * 6, setup_str, statement)
+
+
+@test
+def perf_execution_large_column_index_test():
+    iterations = LARGE_TEST_ITERATION
+    count = LARGE_TEST_COUNT
+
+    setup_str = """
+import random
+from search import search, SearchIndex
+from search.indexes import INDEX_TYPES
+
+random.seed(0)
+values = [dict(timestamp=1700000000 + i, temperature=random.uniform(-20, 40))
+    for i in range({0})]
+
+query_str = 'temperature > 35.5 and timestamp >= 1700010000'
+expected = len(search(query_str, values))
+values = SearchIndex(values)
+# numpy is optional, without it the values are scanned
+if 'column' in INDEX_TYPES:
+    values.create_index('temperature', kind='column')
+    values.create_index('timestamp', kind='column')
+""".format(count)
+
+    statement = """
+results = search(query_str, values)
+assert len(results) == expected
+"""
+
+    run_perf_test(iterations, count, setup_str, statement)
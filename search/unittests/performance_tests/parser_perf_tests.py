@@ -0,0 +1,53 @@
+# parser_perf_tests.py
+import timeit
+
+from .. import logger, test
+
+ITERATIONS = 1000
+PADDING = len('time per iteration')
+
+MIXED_DATES = [
+    '2020-01-05',
+    '01-05-2020',
+    '1-5-20',
+    '01/05/2020',
+    '1/5/20',
+    '01052020',
+    '010520',
+    '1/5',
+    '01-05',
+    '0105',
+    '20200105',
+    '2020/01/05',
+    '200105',
+    '2020-01-05T10:30:00',
+    'not a date',
+]
+
+
+@test
+def perf_date_parser_mixed_formats_test():
+    setup = 'from search.parsers.date import ' \
+        'clear_cache, parse_date, parse_datetime'
+    statements = {
+        # Clear the caches, so every string is parsed
+        'uncached': 'clear_cache()\n'
+                    'for value in values: parse_date(value), '
+                    'parse_datetime(value)',
+        'cached': 'for value in values: parse_date(value), '
+                  'parse_datetime(value)',
+    }
+
+    for name, statement in statements.items():
+        total_time = timeit.timeit(
+            statement,
+            setup=setup,
+            globals={'values': MIXED_DATES},
+            number=ITERATIONS) * 1000
+
+        logger.info(f"{'parser':>{PADDING}}: {name:>15}")
+        logger.info(f"{'Total Iterations':>{PADDING}}: {ITERATIONS:>15,}")
+        logger.info(f"{'Total dates':>{PADDING}}: {len(MIXED_DATES):>15,}")
+        logger.info(
+            f"{'time per iteration':>{PADDING}}: "
+            f"{total_time / ITERATIONS:>12,.4f} ms")
@@ -0,0 +1,43 @@
+# bitmap_unittests.py
+from search import bitmap, Query
+
+from .. import unittest, TestObject
+
+
+@unittest
+def unittest_bitmap_positions():
+    '''Validate bitmaps round trip positions, in ascending order'''
+    positions = [0, 3, 7, 8, 64, 1000]
+    result = bitmap.from_positions(reversed(positions))
+
+    assert list(bitmap.iter_positions(result)) == positions
+    assert bitmap.count(result) == len(positions)
+
+    assert bitmap.from_positions([]) == 0
+    assert list(bitmap.iter_positions(0)) == []
+
+    assert list(bitmap.iter_positions(bitmap.full(10))) == list(range(10))
+    assert bitmap.full(0) == 0
+
+
+@unittest
+def unittest_tree_engine_preserves_order_and_duplicates():
+    '''Validate the tree engine returns matches in input order, including
+    duplicate and unhashable values
+    '''
+    obj = TestObject(x=1)
+    values = [
+        dict(x=3),
+        obj,
+        [1, 2],
+        dict(x=1),
+        obj,
+        [3, 1],
+    ]
+
+    for engine in ('tree', 'predicate', 'jit'):
+        results = Query('x = 1 or 1 = 1', engine=engine)(values)
+        assert results == [obj, dict(x=1), obj, [3, 1]], results
+
+        results = Query('!(x = 1)', engine=engine)(iter(values))
+        assert results == [dict(x=3), [1, 2], [3, 1]], results
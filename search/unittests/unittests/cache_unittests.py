@@ -0,0 +1,72 @@
+# cache_unittests.py
+from search import (
+    clear_query_cache,
+    Query,
+    query_cache_info,
+    set_query_cache_size,
+)
+from search.cache import LRUCache
+from search.query import DEFAULT_QUERY_CACHE_SIZE
+
+from .. import unittest
+
+
+@unittest
+def unittest_lru_cache_eviction():
+    '''Validate the least recently used entry is evicted when full'''
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+
+    # Access 'a' so 'b' becomes the least recently used entry
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert cache.get('b') is None
+
+    info = cache.info()
+    assert (info.hits, info.misses, info.evictions) == (1, 1, 1), info
+    assert (info.maxsize, info.currsize) == (2, 2), info
+
+
+@unittest
+def unittest_lru_cache_resize():
+    '''Validate shrinking the cache evicts entries and a size of 0 disables
+    the cache
+    '''
+    cache = LRUCache(maxsize=None)
+    for i in range(10):
+        cache.put(i, i)
+    assert len(cache) == 10
+
+    cache.maxsize = 3
+    assert len(cache) == 3 and cache.info().evictions == 7
+    assert all(i in cache for i in range(7, 10))
+
+    cache.maxsize = 0
+    cache.put('a', 1)
+    assert len(cache) == 0
+
+
+@unittest
+def unittest_query_cache():
+    '''Validate equivalent query strings share a compiled condition'''
+    clear_query_cache()
+    try:
+        q1 = Query('x = 1 and  y = 2')
+        q2 = Query('  x = 1   and y = 2 ')
+        q3 = Query('x = 2')
+
+        assert str(q1) == str(q2)
+        assert str(q3) != str(q1)
+        assert q3([dict(x=2), dict(x=1, y=2)]) == [dict(x=2)]
+
+        info = query_cache_info()
+        assert (info.hits, info.misses, info.currsize) == (1, 2, 2), info
+
+        set_query_cache_size(1)
+        assert query_cache_info().evictions == 1
+    finally:
+        set_query_cache_size(DEFAULT_QUERY_CACHE_SIZE)
+        clear_query_cache()
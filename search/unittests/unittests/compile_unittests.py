@@ -0,0 +1,115 @@
+# compile_unittests.py
+from concurrent.futures import ThreadPoolExecutor
+
+from search import Query
+from search.lexer import _build, compile
+from search.pratt import compile as pratt_compile
+
+from . import validate_results
+from .. import unittest, TestObject
+
+
+# Query strings used throughout the unittests, plus invalid query strings
+QUERY_STRINGS = [
+    '!name like (?i)mike',
+    '!(name like (?i)mike)',
+    '!!x=2',
+    'foo.bar.gurp=10',
+    'foo\\.bar\\.gurp=10',
+    'fo.*\\.[a-z]+\\.gurp=10',
+    "name = 'mIke'",
+    'name = "mIke"',
+    'name = \'mIke"',
+    'name like (?i)mike and ^fo{2}',
+    'name like Mike',
+    'name',
+    'x != 3',
+    'x < 3',
+    'x <= 3',
+    'x > 3',
+    'x >= 3',
+    'x=3',
+    "x = ''",
+    'x = None',
+    'x = 1 and y <= 5',
+    'x = 3 and (name like (?i)mike and ^fo{2})',
+    'x = 3 or (name like mike and ^fo{2})',
+    'a = 1 AND b = 2 || c ~ 3 && !d Or !(e)',
+    'a or b and c or !(d and !e)',
+    "foo=bar and (!(foo like bar or x) or name ='Tom')",
+    '((((x = 1))))',
+    'x = (',
+    'x = 1 # 2',
+    '(x = 1',
+    'x = 1 and',
+    'x y',
+    '!',
+]
+
+
+@unittest
+def unittest_compile_invalid_query():
+    '''Validate an invalid query does not affect subsequent compiles'''
+    assert compile('x = (') is None
+    assert compile('x = 1 # 2') is None
+    assert str(compile('x = 1')) == '(x = 1)'
+
+
+@unittest
+def unittest_parse_without_compile():
+    '''Validate the shared parser reports errors by default, when used
+    without `compile`
+    '''
+    lexer, parser = _build()
+    assert parser.parse('x = 1 and', lexer=lexer.clone()) is None
+    assert str(parser.parse('x = 1', lexer=lexer.clone())) == '(x = 1)'
+
+
+@unittest
+def unittest_compile_concurrently():
+    '''Validate compiles running on multiple threads do not share error
+    state
+    '''
+    queries = [
+        f'x{i} = {i} and !(y like {i})' if i % 3 else f'x{i} = (({i}'
+        for i in range(500)
+    ]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(compile, queries))
+
+    for i, result in enumerate(results):
+        if i % 3:
+            assert str(result) == f'[(x{i} = {i}) AND [NOT (y LIKE {i})]]', \
+                f'Unexpected result for {queries[i]!r}: {result}'
+        else:
+            assert result is None, f'Expected {queries[i]!r} to be invalid'
+
+
+@unittest
+def unittest_pratt_parser_matches_ply_parser():
+    '''Validate the Pratt parser compiles identical condition trees'''
+    for query_str in QUERY_STRINGS:
+        expected = str(compile(query_str))
+        actual = str(pratt_compile(query_str))
+
+        assert expected == actual, \
+            f'Unexpected result for {query_str!r}: ' \
+            f'Expected: {expected}  Actual: {actual}'
+
+
+@unittest
+def unittest_pratt_parser_search():
+    '''Validate searching using the Pratt parser engine'''
+    values = [
+        TestObject(x=3, y=2, foo='gurp', name='mIke'),
+        TestObject(x=3, y=2, foo='gurp', name='Mike'),
+        TestObject(x=2, y=2, foo='gurp'),
+    ]
+    query_str = 'x = 3 and !(name like mIke)'
+
+    assert str(Query(query_str, parser='pratt')) == str(Query(query_str))
+    validate_results(
+        expected=values[1:2],
+        actual=Query(query_str, parser='pratt')(values)
+    )
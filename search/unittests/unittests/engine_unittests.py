@@ -0,0 +1,164 @@
+# engine_unittests.py
+import gc
+import weakref
+
+from search import bitmap, Query
+from search.conditions import (
+    AndStatement,
+    Condition,
+    NotStatement,
+    OrStatement,
+)
+from search.query import compile_query
+
+from .. import unittest, TestObject
+
+
+class CountingCondition(Condition):
+    '''Test condition that always returns result and counts the number of
+    times its predicate is evaluated
+    '''
+    def __init__(self, result):
+        self.result = result
+        self.count = 0
+
+    def __call__(self, values, candidates):
+        self.count += bitmap.count(candidates)
+        return candidates if self.result else 0
+
+    def __str__(self):
+        return str(self.result)
+
+    def predicate(self):
+        def predicate(value):
+            self.count += 1
+            return self.result
+        return predicate
+
+
+@unittest
+def unittest_predicate_engine_preserves_order():
+    '''Validate the predicate engine returns results in input order,
+    including duplicates
+    '''
+    obj = TestObject(x=1)
+    values = [
+        {'x': 3},
+        obj,
+        [1, 2],
+        {'x': 2},
+        obj,
+        TestObject(x=4),
+    ]
+
+    results = Query('x > 1 or 1 = 2', engine='predicate')(values)
+    assert results == [values[0], values[2], values[3], values[5]], results
+
+    results = Query('x = 1', engine='predicate')(values)
+    assert results == [obj, obj], results
+
+
+@unittest
+def unittest_predicate_engine_short_circuits():
+    '''Validate AND stops at the first false condition and OR stops at the
+    first true condition
+    '''
+    for statement, first, expected in [
+            (AndStatement, False, False), (OrStatement, True, True)]:
+        condition1 = CountingCondition(first)
+        condition2 = CountingCondition(not first)
+
+        predicate = statement(condition1, condition2).predicate()
+        assert [predicate(value) for value in range(5)] == [expected] * 5
+
+        assert condition1.count == 5, condition1.count
+        assert condition2.count == 0, condition2.count
+
+
+@unittest
+def unittest_jit_engine():
+    '''Validate the jit engine compiles each query once and exposes the
+    generated source
+    '''
+    from search.jit import compile_condition
+
+    query_str = 'x > 2 and !(name like (?i)^mi) or y = None'
+    values = [
+        TestObject(x=3, name='Tom'),
+        TestObject(x=3, name='Mike'),
+        TestObject(x='3', name='mike'),
+        TestObject(x=1.5, y=None),
+        {'x': 2.5},
+    ]
+
+    query = Query(query_str, engine='jit')
+    results = query(values)
+    assert results == [values[0], values[3], values[4]], results
+
+    explanation = query.explain()
+    assert explanation.startswith(f'{query}\nENGINE: jit\n'), explanation
+    assert 'def query(obj):' in explanation, explanation
+
+    condition = compile_query(query_str)
+    assert compile_condition(condition) is compile_condition(condition)
+
+
+@unittest
+def unittest_jit_engine_frees_conditions():
+    '''Validate compiled conditions are freed with the condition, including
+    conditions whose predicates reference the condition
+    '''
+    from search.jit import compile_condition
+
+    condition = CountingCondition(True)
+    compiled = compile_condition(condition)
+    assert compiled.function(TestObject(x=3)) and condition.count == 1
+
+    reference = weakref.ref(condition)
+    del condition, compiled
+    gc.collect()
+    assert reference() is None
+
+
+@unittest
+def unittest_tree_engine_narrows_and():
+    '''Validate the second condition of an AND only evaluates the values
+    matched by the first condition, including NOT statements
+    '''
+    values = [TestObject(x=i) for i in range(1, 11)]
+    candidates = bitmap.full(len(values))
+
+    condition = CountingCondition(True)
+    results = AndStatement(
+        compile_query('x = 3'), condition)(values, candidates)
+    assert results == 0b100 and condition.count == 1, condition.count
+
+    condition = CountingCondition(True)
+    results = AndStatement(
+        compile_query('x < 3'), NotStatement(condition))(values, candidates)
+    assert results == 0 and condition.count == 2, condition.count
+
+    condition = CountingCondition(True)
+    results = AndStatement(
+        compile_query('x = 11'), condition)(values, candidates)
+    assert results == 0 and condition.count == 0, condition.count
+
+
+@unittest
+def unittest_query_iter():
+    '''Validate iter lazily yields matching values in input order'''
+    def generate():
+        i = 0
+        while True:
+            i += 1
+            yield {'x': i % 3, 'i': i} if i % 5 else [i % 3]
+
+    for engine in ['tree', 'predicate', 'jit']:
+        results = Query('x = 1 or 0 = 1', engine=engine).iter(generate())
+        assert next(results) == {'x': 1, 'i': 1}
+        assert next(results) == {'x': 1, 'i': 4}
+        assert next(results) == {'x': 1, 'i': 7}
+        assert next(results) == [1]
+
+    values = [{'x': 1}, {'x': 2}]
+    assert list(Query('').iter(iter(values))) == values
@@ -0,0 +1,135 @@
+# field_unittests.py
+from collections import namedtuple
+from collections.abc import Mapping
+
+from search import Query
+from search.field import literal_name
+from search.query import EXECUTION_ENGINES
+
+from . import run_unittest_and_verify_results
+from .. import unittest, TestObject
+
+
+@unittest
+def unittest_literal_name():
+    '''Validate literal field names are detected'''
+    assert literal_name('name') == ('name', False)
+    assert literal_name('first_name') == ('first_name', False)
+    assert literal_name('^name$') == ('name', True)
+
+    for pattern in ('^name', 'name$', 'fo{2}', 'na.e', '(?i)name', '^$', ''):
+        assert literal_name(pattern) == (None, False), pattern
+
+
+@unittest
+def unittest_literal_name_exact_match_first():
+    '''Validate an attribute named exactly as a literal field name is matched
+    before attributes whose names only contain the field name
+    '''
+    values = [
+        dict(username='tom', name='mike'),
+        TestObject(username='tom', name='mike'),
+        dict(username='mike'),
+        TestObject(username='mike'),
+        dict(username='tom'),
+    ]
+    run_unittest_and_verify_results('name = mike', values, values[:4])
+    run_unittest_and_verify_results('name = tom', values, values[4:])
+
+    # Anchored names never match attributes containing the name
+    run_unittest_and_verify_results('^name$ = mike', values, values[:2])
+    run_unittest_and_verify_results('name', values, values[:2])
+
+
+@unittest
+def unittest_field_conversions_cached():
+    '''Validate the query value is converted once per attribute type,
+    including failed conversions
+    '''
+    conversions = []
+
+    class Version(object):
+        def __init__(self, value):
+            conversions.append(value)
+            self.parts = tuple(int(part) for part in value.split('.'))
+
+        def __eq__(self, other):
+            return isinstance(other, Version) and self.parts == other.parts
+
+        def __hash__(self):
+            return hash(self.parts)
+
+    values = [TestObject(version=Version('1.2')) for _ in range(5)]
+
+    # Every engine evaluates the same compiled query, and so the same Field,
+    # which converts the query value once
+    for query_str, expected in (('version = 1.2', values), ('version = x', [])):
+        del conversions[:]
+        for engine in EXECUTION_ENGINES:
+            assert Query(query_str, engine=engine)(values) == expected
+
+        # Version('x') raises, the failed conversion is also cached
+        assert conversions == [query_str.split()[-1]], conversions
+
+
+class Point(object):
+    __slots__ = ('x', 'y', '_z')
+
+    def __init__(self, x, y=None):
+        self.x = x
+        if y is not None:
+            self.y = y
+        self._z = 1
+
+
+class Point3D(Point):
+    __slots__ = 'z'
+
+    def __init__(self, x, y, z):
+        super(Point3D, self).__init__(x, y)
+        self.z = z
+
+
+class Record(Mapping):
+    '''A read only Mapping, which is not a dict'''
+    def __init__(self, **kwargs):
+        self.__values = kwargs
+
+    def __getitem__(self, key):
+        return self.__values[key]
+
+    def __iter__(self):
+        return iter(self.__values)
+
+    def __len__(self):
+        return len(self.__values)
+
+
+@unittest
+def unittest_slots_namedtuples_and_mappings():
+    '''Validate objects without a __dict__ are searchable: classes defining
+    __slots__, namedtuples and Mappings
+    '''
+    Person = namedtuple('Person', ['name', 'age'])
+
+    values = [
+        Point(x=1, y=2),
+        Point(x=1),             # y is not set
+        Point3D(x=1, y=2, z=3),
+        Person(name='mike', age=2),
+        Record(x=1, y=2),
+        Record(name='mike', y=3),
+        Point(x=Record(y=2)),
+    ]
+
+    def select(*indexes):
+        return [values[i] for i in indexes]
+
+    run_unittest_and_verify_results('y = 2', values, select(0, 2, 4))
+    run_unittest_and_verify_results('x = 1', values, select(0, 1, 2, 4))
+    run_unittest_and_verify_results('z = 3', values, select(2))
+    run_unittest_and_verify_results('_z', values, [])
+    run_unittest_and_verify_results('name = mike', values, select(3, 5))
+    run_unittest_and_verify_results('age < 3 or y > 2', values, select(3, 5))
+    run_unittest_and_verify_results('x.y = 2', values, select(6))
+    run_unittest_and_verify_results('^y', values, select(0, 2, 4, 5))
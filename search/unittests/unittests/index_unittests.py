@@ -0,0 +1,583 @@
+# index_unittests.py
+from datetime import date, datetime, timedelta, timezone
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from search import Query, SearchIndex
+from search.field import get_attributes
+from search.indexes import (
+    ColumnIndex,
+    HashIndex,
+    INDEX_TYPES,
+    IndexedObject,
+    NameIndex,
+    NgramIndex,
+    RangeIndex,
+)
+from search.indexes.ngram_index import required_substrings
+
+from . import run_unittest_and_verify_results
+from .. import unittest, TestObject
+from .field_unittests import Point, Record
+
+
+def mixed_values():
+    '''Returns a collection of dicts and objects whose values, of the field x,
+    are of mixed types, including falsy and unhashable values
+    '''
+    values = []
+    for x in (1, '1', 1.0, 2, 'a', '', None, 0, False, True, [1], [],
+            date(2020, 1, 5), '2020-01-05', 'None'):
+        values.extend([dict(x=x, y=1), TestObject(x=x), dict(xx=x)])
+    values.append(dict(y=2))
+    return values
+
+
+@unittest
+def unittest_hash_index_equality():
+    '''Validate '=' and '!=' queries return the same results, in the same
+    order, with and without a hash index, for every type of value
+    '''
+    values = mixed_values()
+    index = SearchIndex(values, fields=('x', '^x$'))
+
+    for value in ('1', '2', '1.0', 'a', '""', 'None', '.*', 'True', 'False',
+            '0', '2020-01-05', '[1]', 'b'):
+        for op in ('=', '!='):
+            for name in ('x', '^x$'):
+                query_str = f'{name} {op} {value}'
+                expected = Query(query_str)(values)
+                actual = Query(query_str)(index)
+                assert actual == expected, \
+                    f'{query_str}: expected {expected} actual {actual}'
+
+    for query_str in ('x = 1 and y = 1', 'x = 1 or !(y = 1)', '!(x != a)',
+            'x = 1 and x.y = 1'):
+        assert Query(query_str)(index) == Query(query_str)(values), query_str
+
+
+@unittest
+def unittest_range_index_comparisons():
+    '''Validate '<', '<=', '>' and '>=' queries return the same results, in
+    the same order, with and without a range index, for every type of value
+    '''
+    values = mixed_values()
+    values.extend(dict(x=x) for x in (
+        -1, 2.5, float('nan'), 'b', date(2020, 2, 1),
+        datetime(2020, 1, 5, 10), datetime(2020, 1, 5, tzinfo=timezone.utc)))
+
+    index = SearchIndex(values)
+    index.create_index('x', kind='range')
+
+    for value in ('1', '2', '1.5', 'a', '""', '.*', 'True', '0', '-1', 'z',
+            '2020-01-05', '2020-01-05T10:00:00'):
+        for op in ('<', '<=', '>', '>='):
+            query_str = f'x {op} {value}'
+            try:
+                expected = Query(query_str)(values)
+            except TypeError:
+                # e.g. comparing None to a value
+                expected = TypeError
+
+            try:
+                actual = Query(query_str)(index)
+            except TypeError:
+                actual = TypeError
+
+            assert actual == expected, \
+                f'{query_str}: expected {expected} actual {actual}'
+
+
+@unittest
+def unittest_range_index_time_window():
+    '''Validate a range index resolves time windows spanning many blocks of
+    sorted values, including duplicate values
+    '''
+    start = date(2026, 1, 1)
+    values = [dict(date=start + timedelta(days=i % 365), id=i)
+        for i in range(5000)]
+    index = SearchIndex(values)
+    range_index = index.create_index('date', kind='range')
+    assert isinstance(range_index, RangeIndex) and len(range_index) == 5000
+
+    for query_str in (
+            'date >= 2026-01-01 and date < 2026-02-01',
+            'date > 2026-03-15 and date <= 2026-03-16',
+            '!(date < 2026-12-31)',
+            'date < 2025-01-01 or date > 2027-01-01',
+            'date >= 2026-06-01 and id < 1000'):
+        expected = Query(query_str, engine='predicate')(values)
+        assert Query(query_str)(index) == expected, query_str
+
+    results = Query('date >= 2026-01-01 and date < 2026-02-01')(index)
+    assert len(results) == 31 * len(range(0, 5000, 365)), len(results)
+
+
+@unittest
+def unittest_column_index_comparisons():
+    '''Validate comparison queries return the same results, in the same
+    order, with and without a column index, for every type of value, and as
+    values are changed, saved and loaded
+    '''
+    if 'column' not in INDEX_TYPES:
+        # numpy is not installed
+        return
+
+    # numpy is only imported when a column index is used.  The child process
+    # imports search from the same path, wherever the tests are run from.
+    path = os.pathsep.join(os.path.abspath(p) for p in sys.path)
+    imported = subprocess.run([sys.executable, '-c',
+        'import sys, search; print("numpy" in sys.modules)'],
+        env=dict(os.environ, PYTHONPATH=path),
+        capture_output=True, text=True, check=True).stdout.strip()
+    assert imported == 'False', imported
+
+    values = mixed_values()
+    values.extend(dict(x=x) for x in (-1, 2.5, -0.0, float('nan'),
+        float('inf'), 2 ** 63 - 1, 2 ** 70, 'b', date(2020, 2, 1)))
+
+    index = SearchIndex(values)
+    column_index = index.create_index('x', kind='column')
+    assert isinstance(column_index, ColumnIndex)
+
+    def validate(index, values):
+        for value in ('1', '2', '1.5', '-1', '0', 'nan', 'inf', '1e3', 'a',
+                '""', 'None', 'True', '9223372036854775807', str(2 ** 70)):
+            for op in ('=', '!=', '<', '<=', '>', '>='):
+                query_str = f'x {op} {value}'
+                expected = execute(query_str, values)
+                actual = execute(query_str, index)
+                assert actual == expected, \
+                    f'{query_str}: expected {expected} actual {actual}'
+
+        for query_str in ('x > 1 and x < 3', 'x = 1 or !(x >= 2)',
+                '!(x != 2.5) and y = 1'):
+            expected = execute(query_str, values)
+            assert execute(query_str, index) == expected, query_str
+
+    validate(index, values)
+
+    random.seed(0)
+    for _ in range(100):
+        value = random.choice(index)
+        if isinstance(value, dict) and random.random() < 0.5:
+            value['x'] = random.choice((0, 1, 2, -3, 1.5, 'a', 2 ** 70))
+            index.update(value)
+        else:
+            index.remove(value)
+            index.add(dict(x=random.randrange(-5, 5)))
+    validate(index, list(index))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'index')
+        index.save(path)
+        loaded = SearchIndex.load(path, index)
+        loaded.add(dict(x=7))
+        validate(loaded, list(loaded))
+
+
+@unittest
+def unittest_required_substrings():
+    '''Validate the substrings required by regular expressions are extracted'''
+    assert required_substrings('timeout') == ['timeout']
+    assert required_substrings('^conn.*refused$') == ['conn', 'refused']
+    assert required_substrings(r'a\.b?c') == ['a.', 'c']
+    assert required_substrings('(err)+or') == ['err', 'or']
+    assert required_substrings('user (login|fail)') == \
+        ['user ', (['login'], ['fail'])]
+    assert required_substrings('x(?i:ERROR)y') == ['x', 'y']
+
+    for pattern in ('.*', '[0-9]+', '(?i)timeout', '(abc)*', 'a?'):
+        assert required_substrings(pattern) == [], pattern
+
+
+@unittest
+def unittest_ngram_index_like():
+    '''Validate 'like' queries return the same results, in the same order,
+    with and without an ngram index
+    '''
+    words = ('timeout', 'error', 'connection', 'refused', 'Login', 'a.c')
+    values = [dict(message=' '.join(words[j % len(words)]
+        for j in range(i, i + i % 4))) for i in range(200)]
+    values.extend(dict(message=m) for m in ('', None, 1, 0, 2.5))
+    values.extend(TestObject(message=m) for m in ('timeout', 'x|y'))
+
+    index = SearchIndex(values)
+    ngram_index = index.create_index('message', kind='ngram')
+    assert isinstance(ngram_index, NgramIndex)
+
+    for pattern in ('timeout', 'time', 'out', 'ab', 'conn.*refused',
+            '^error', 'refused$', r'a\.c', 'timeout|login', '(?i)login',
+            '.*', '""', 'x\|y', 'zzz', '[0-9]'):
+        for query_str in (f'message like {pattern}',
+                f'!(message like {pattern})',
+                f'message like {pattern} and message like error'):
+            expected = Query(query_str)(values)
+            actual = Query(query_str)(index)
+            assert actual == expected, \
+                f'{query_str}: expected {expected} actual {actual}'
+
+
+@unittest
+def unittest_name_index():
+    '''Validate bare name queries, and queries of regular expression field
+    names, return the same results, in the same order, with and without an
+    index of attribute names
+    '''
+    values = []
+    for i, x in enumerate((1, 0, '', None, 'mike', False, [], [1])):
+        values.extend([
+            dict(name=x, age=i),
+            TestObject(name=x, username='tom', _age=i),
+            Point(x=x, y=i),
+            Record(Name=x, fo0d=i),
+            [x, i],
+        ])
+    values.extend(['name', 5, None])
+
+    index = SearchIndex(values, names=True)
+    name_index, = index.indexes
+    assert isinstance(name_index, NameIndex)
+    assert sorted(name_index.names()) == \
+        ['0', '1', 'Name', 'age', 'fo0d', 'name', 'username', 'x', 'y']
+
+    for query_str in ('name', 'Name', 'x', 'y', 'age', '_age', '0', 'fo0d',
+            'zzz', '!name', 'name and age', '(?i)name = mike', '^na != 1',
+            'name = tom', '[xy] = 3', 'name or fo0d > 5', 'fo0d = 0'):
+        expected = Query(query_str)(values)
+        actual = Query(query_str)(index)
+        assert actual == expected, \
+            f'{query_str}: expected {expected} actual {actual}'
+
+
+@unittest
+def unittest_get_attributes():
+    '''Validate the attributes field names are matched against are returned'''
+    assert get_attributes(dict(x=1, _y=2)) == [('x', 1), ('_y', 2)]
+    assert get_attributes([3, 4]) == [('0', 3), ('1', 4)]
+    assert get_attributes(TestObject(x=1, _y=2)) == [('x', 1)]
+    assert get_attributes(Point(x=1)) == [('x', 1)]
+    assert get_attributes(Record(x=1)) == [('x', 1)]
+    assert get_attributes(5) == []
+
+
+@unittest
+def unittest_hash_index_avoids_scanning():
+    '''Validate objects are only looked up when the index is built'''
+    lookups = []
+
+    class Item(object):
+        def __init__(self, name):
+            self.__name = name
+
+        @property
+        def name(self):
+            lookups.append(self.__name)
+            return self.__name
+
+    values = [Item('mike'), Item('tom'), Item('mike'), Item('bob')]
+    index = SearchIndex(values)
+    index.create_index('name')
+    assert len(lookups) == len(values), lookups
+
+    for engine in ('tree', 'predicate', 'jit'):
+        del lookups[:]
+        assert Query('name = mike', engine=engine)(index) == values[0:3:2]
+        assert Query('name != mike', engine=engine)(index) == values[1:4:2]
+
+        # Only the tree engine uses indexes
+        assert not lookups if engine == 'tree' else lookups, engine
+
+
+@unittest
+def unittest_search_index_sequence():
+    '''Validate a SearchIndex is a copy of its values, searchable using
+    every parser and engine
+    '''
+    values = [dict(x=1), TestObject(x=2), dict(x=1)]
+    index = SearchIndex(values, fields=('x',))
+    values.append(dict(x=1))
+
+    assert len(index) == 3 and list(index) == values[:3] and index[1] is values[1]
+    run_unittest_and_verify_results('x = 1', index, [values[0], values[2]])
+
+    assert all(kind in INDEX_TYPES for kind in ('hash', 'range', 'ngram'))
+    hash_index, = index.indexes
+    assert isinstance(hash_index, HashIndex) and len(hash_index) == 2
+
+    # Indexes are replaced, and dropped, per field and kind
+    index.create_index('x')
+    assert len(index.indexes) == 1
+    index.drop_index('x')
+    assert index.indexes == []
+    assert Query('x = 1')(index) == [values[0], values[2]]
+
+    # Nested fields can not be indexed
+    try:
+        index.create_index('x.y')
+    except AssertionError:
+        pass
+    else:
+        assert False, 'nested fields are not indexed'
+
+
+def execute(query_str, values):
+    '''Returns the results of the query, or the type of error raised, e.g.
+    comparing mismatched types
+    '''
+    try:
+        return Query(query_str)(values)
+    except TypeError as e:
+        return type(e)
+
+
+@unittest
+def unittest_search_index_changes():
+    '''Validate values added, removed and updated are reflected by every
+    index, and queries return the same results as the equivalent list
+    '''
+    random.seed(0)
+    xs = (1, '1', 2.0, 'a', 'abc', 'conn refused', '', None, 0, [1],
+        date(2020, 1, 5), '2020-01-05')
+
+    def create():
+        if random.random() < 0.5:
+            return dict(x=random.choice(xs), y=random.choice(xs))
+        return TestObject(x=random.choice(xs))
+
+    values = [create() for _ in range(100)]
+    index = SearchIndex(values, fields=('y',), names=True)
+    for kind in ('hash', 'range', 'ngram'):
+        index.create_index('x', kind=kind)
+
+    query_strs = [f'{name} {op} {value}'
+        for name in ('x', 'y')
+        for op in ('=', '!=', '<', '>=', 'like')
+        for value in ('1', 'a', '""', 'None', '2020-01-05', 'conn')]
+    query_strs += ['x', '!y', 'x and !y']
+
+    for i in range(600):
+        r = random.random()
+        if r < 0.3:
+            value = create()
+            values.append(value)
+            index.add(value)
+        elif r < 0.6:
+            # The last value is moved to the position of the value removed
+            value = random.choice(values)
+            position = next(i for i, v in enumerate(values) if v is value)
+            last = values.pop()
+            if position < len(values):
+                values[position] = last
+            index.remove(value)
+        else:
+            value = random.choice(values)
+            if isinstance(value, dict):
+                value['x'] = random.choice(xs)
+            else:
+                value.x = random.choice(xs)
+            index.update(value)
+
+        if i % 50 == 0:
+            assert list(index) == values
+            for query_str in query_strs:
+                expected = execute(query_str, values)
+                actual = execute(query_str, index)
+                assert actual == expected, \
+                    f'{query_str}: expected {expected} actual {actual}'
+
+    # Values are compared by identity
+    value = dict(x=1)
+    index.add(value)
+    for func, error in ((index.add, AssertionError),
+            (lambda v: index.remove(dict(v)), ValueError),
+            (lambda v: index.update(dict(v)), ValueError)):
+        try:
+            func(value)
+        except error:
+            pass
+        else:
+            assert False, f'expected {error.__name__}'
+
+
+class Item(IndexedObject, TestObject):
+    '''A TestObject which updates the SearchIndexes containing it'''
+    pass
+
+
+@unittest
+def unittest_indexed_object():
+    '''Validate IndexedObjects update the SearchIndexes containing them
+    when their public attributes are set or deleted
+    '''
+    values = [Item(x=i, name=f'item{i}') for i in range(1, 11)]
+    index = SearchIndex(values, fields=('x',), names=True)
+    index.create_index('x', kind='range')
+    other = SearchIndex(values[:5], fields=('x',))
+
+    values[1].x = 100
+    values[2]._x = 100
+    del values[3].x
+    assert Query('x = 100')(index) == [values[1]]
+    assert Query('x >= 100')(index) == [values[1]]
+    assert Query('x = 100')(other) == [values[1]]
+    assert Query('!x')(index) == [values[3]]
+
+    # Values removed are no longer updated
+    index.remove(values[1])
+    values[1].x = 200
+    assert Query('x = 200')(index) == []
+    assert Query('x = 200')(other) == [values[1]]
+
+    item = Item(x=300)
+    index.add(item)
+    item.x = 400
+    assert Query('x = 400')(index) == [item]
+
+
+class Counter(IndexedObject):
+    '''An IndexedObject whose searched property is computed from a private
+    attribute
+    '''
+    def __init__(self, n):
+        self._n = n
+
+    @property
+    def n(self):
+        return self._n
+
+    def bump(self):
+        self._n += 10
+
+
+@unittest
+def unittest_indexed_object_properties():
+    '''Validate IndexedObjects whose class defines properties update the
+    SearchIndexes containing them when private attributes are set or deleted
+    '''
+    values = [Counter(i) for i in range(1, 4)]
+    index = SearchIndex(values, fields=('n',))
+    index.create_index('n', kind='range')
+
+    values[0].bump()
+    for query_str in ('n = 11', 'n > 10'):
+        expected = Query(query_str)(values)
+        assert expected == [values[0]], expected
+        assert Query(query_str)(index) == expected, query_str
+
+    del values[1]._n
+    assert Query('n')(index) == Query('n')(values) == [values[0], values[2]]
+
+
+@unittest
+def unittest_search_index_save_load():
+    '''Validate a SearchIndex loaded from a file returns the same results as
+    the SearchIndex saved, and can be changed
+    '''
+    values = mixed_values() + [dict(x=f'x{i}', y=i % 7) for i in range(2000)]
+    index = SearchIndex(values, fields=('x', 'y'), names=True)
+    index.create_index('x', kind='range')
+    index.create_index('x', kind='ngram')
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'index')
+        index.save(path)
+        loaded = SearchIndex.load(path, values)
+        assert [str(i) for i in loaded.indexes] == \
+            [str(i) for i in index.indexes]
+
+        for query_str in ('x = 1', 'x != a', 'x > 1', 'x <= x5', 'y = 3',
+                'x like ^x1.*9$', 'x like ""', 'fo0d', 'x and !y', 'xx'):
+            expected = execute(query_str, index)
+            assert execute(query_str, loaded) == expected, query_str
+
+        # Changes are only made to the loaded SearchIndex
+        value = dict(x='x7', y=100)
+        loaded.add(value)
+        loaded.remove(values[0])
+        loaded.update(values[-1])
+        assert Query('y = 100')(loaded) == [value]
+        for query_str in ('x = x7', 'x > x5', 'x like 7$', 'y'):
+            expected = execute(query_str, list(loaded))
+            assert execute(query_str, loaded) == expected, query_str
+        assert Query('y = 100')(SearchIndex.load(path, values)) == []
+
+        # The values must be the values saved
+        try:
+            SearchIndex.load(path, values[1:])
+        except AssertionError:
+            pass
+        else:
+            assert False, 'expected AssertionError'
+
+        with open(path, 'wb') as f:
+            f.write(b'not an index')
+        try:
+            SearchIndex.load(path, values)
+        except ValueError:
+            pass
+        else:
+            assert False, 'expected ValueError'
+
+
+@unittest
+def unittest_index_advisor():
+    '''Validate the advisor records the workload of queries, recommends an
+    index of each operator's type for the fields scanned, within a memory
+    budget, and creates them, explicitly and automatically
+    '''
+    values = [dict(sku=f'sku{i}', qty=i % 100, message=f'order {i} shipped',
+        point=dict(x=i)) for i in range(1000)]
+    queries = ('sku = sku7', 'qty < 10', 'message like 7.shipped',
+        'point.x = 7')
+    expected = {q: Query(q)(values) for q in queries}
+
+    index = SearchIndex(values, fields=('sku',))
+    for query_str in queries:
+        assert Query(query_str)(index) == expected[query_str], query_str
+
+    # Nested fields are not recorded, and indexed fields are not scanned
+    workload = {(name, op): s for name, op, s in index.advisor.workload()}
+    assert set(workload) == {('sku', '='), ('qty', '<'), ('message', 'LIKE')}
+    assert workload[('sku', '=')].calls == 1
+    assert workload[('sku', '=')].scanned == 0
+    assert workload[('qty', '<')].scanned == len(values)
+
+    # A column index, if numpy is installed, resolves '<' in less memory
+    qty_kind = 'column' if 'column' in INDEX_TYPES else 'range'
+    recommendations = index.advisor.recommend()
+    assert {(r.name, r.kind) for r in recommendations} \
+        == {('qty', qty_kind), ('message', 'ngram')}
+    assert all(r.size > 0 and r.benefit > 0 for r in recommendations)
+
+    # Only the recommendations that fit the memory budget are created
+    budget = min(r.size for r in recommendations)
+    created = index.advisor.create_indexes(memory_budget=budget)
+    assert len(created) == 1 and created[0].size <= budget
+    assert len(index.indexes) == 2
+    assert index.advisor.recommend(memory_budget=0) == []
+
+    index.advisor.create_indexes()
+    assert {type(i) for i in index.indexes} \
+        == {HashIndex, INDEX_TYPES[qty_kind], NgramIndex}
+    assert index.advisor.recommend() == []
+    for query_str in queries:
+        assert Query(query_str)(index) == expected[query_str], query_str
+
+    # Indexes are created every interval expressions evaluated
+    index = SearchIndex(values)
+    index.advisor.enable_auto_create(interval=2)
+    Query('qty < 10')(index)
+    assert index.indexes == []
+    assert Query('qty < 10')(index) == expected['qty < 10']
+    assert [type(i) for i in index.indexes] == [INDEX_TYPES[qty_kind]]
+
+    index.advisor.disable_auto_create()
+    index.advisor.reset()
+    Query('sku = sku7')(index)
+    Query('sku = sku7')(index)
+    assert index.advisor.workload()[0][2].calls == 2
+    assert [type(i) for i in index.indexes] == [INDEX_TYPES[qty_kind]]
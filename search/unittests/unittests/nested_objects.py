@@ -37,4 +37,25 @@ def unittest_nested_object_wildcard_name():
 
     expected_values = values[:1] + values[-1:]
 
-    run_unittest_and_verify_results(query_str, values, expected_values)
\ No newline at end of file
+    run_unittest_and_verify_results(query_str, values, expected_values)
+
+@unittest
+def unittest_nested_object_deep_path():
+    '''Validate deep paths resolve each level, falling back to dotted names
+    at the deepest level reached, then to names containing the field name
+    '''
+    query_str = 'a.b.c.d = 1'
+    values = [
+        {'a': {'b': {'c': {'d': 1}}}},          # match
+        {'a': {'b': {'c.d': 1}}},               # match, dotted name
+        {'a': {'b': {'c': {'d': 2}}, 'b.c.d': 1}}, # match, dotted name
+        {'a': {'b': {'c': {'d': 2}}}},
+        {'a': {'b': {'xc': {'d': 1}}}},         # match, name contains c
+        {'a': {'b': {'c': 1}}},
+        {'a.b.c.d': 1},                         # match, dotted name
+        {'a': None, 'a.b.c.d': 1},              # match, dotted name
+    ]
+
+    expected_values = [values[i] for i in (0, 1, 2, 4, 6, 7)]
+
+    run_unittest_and_verify_results(query_str, values, expected_values)
@@ -0,0 +1,83 @@
+# optimizer_unittests.py
+from search import search
+from search.lexer import compile
+from search.optimizer import optimize
+
+from . import validate_results
+from .. import unittest, TestObject
+
+
+VALUES = [
+    TestObject(x=1, y=2, name='Mike'),
+    TestObject(x=2, y=2, name='Tom'),
+    TestObject(x=3, y=1),
+    {'x': 3, 'y': 3, 'name': 'mike'},
+    {'x': 4, 'z': ''},
+    [1, 2, 3],
+]
+
+
+@unittest
+def unittest_optimizer_rewrites():
+    '''Validate flattening, De Morgan push down and duplicate elimination'''
+    for query_str, expected in [
+        ('x = 1 and (y = 2 and z = 3)', '[(x = 1) AND (y = 2) AND (z = 3)]'),
+        ('(x = 1 or y = 2) or (z = 3 or x = 1)',
+            '[(x = 1) OR (y = 2) OR (z = 3)]'),
+        ('!!x = 1', '(x = 1)'),
+        ('!(x = 1 and y = 2)', '[[NOT (x = 1)] OR [NOT (y = 2)]]'),
+        ('!(x = 1 or !y = 2)', '[[NOT (x = 1)] AND (y = 2)]'),
+        ('!(x = 1 or !(y = 2 and !z))',
+            '[[NOT (x = 1)] AND (y = 2) AND [NOT (ANY z)]]'),
+        ('x = 1 and x = 1', '(x = 1)'),
+        ('x = 1 or (y = 2 and y = 2)', '[(x = 1) OR (y = 2)]'),
+    ]:
+        actual = str(optimize(compile(query_str)))
+        assert actual == expected, \
+            f'Unexpected result for {query_str!r}: ' \
+            f'Expected: {expected}  Actual: {actual}'
+
+
+@unittest
+def unittest_optimizer_dry_run():
+    '''Validate dry run returns the optimized query'''
+    assert search('!!(x = 1 and (y = 2 and x = 1))', [], dry_run=True) == \
+        'QUERY: [(x = 1) AND (y = 2)]'
+    assert search('!!x = 1', [], dry_run=True, optimize=False) == \
+        'QUERY: [NOT [NOT (x = 1)]]'
+
+
+@unittest
+def unittest_optimizer_equivalent_results():
+    '''Validate optimized queries return the same results'''
+    for query_str in [
+        '!(x = 1 or !(y = 2 and !name))',
+        '!(!(x > 1 and y < 3) or (name like (?i)mike and !(z or x = 3)))',
+        '!!(x = 3 or x = 3) and !(y = 1 or y = 1)',
+        '!(0 or 1) or !(x != 3 and !(name = Tom))',
+    ]:
+        validate_results(
+            expected=search(query_str, VALUES, optimize=False),
+            actual=search(query_str, VALUES)
+        )
+
+
+@unittest
+def unittest_optimizer_nested_duplicates():
+    '''Validate nested and escaped dot names, which print the same, are not
+    removed as duplicates
+    '''
+    values = [
+        {'axb': 1}, {'a': {'b': 1}}, {'a.b': 1}, {'a': {'b': 1}, 'axb': 1}]
+    for query_str, count in [
+        (r'a.b = 1 and a\.b = 1', 2),
+        (r'a.b = 1 and a.b = 1', 1),
+        (r'!(a.b = 1) or !(a\.b = 1)', 2),
+        (r'a.b = 1 and !(a\.b = 1 or a.b = 1)', 3),
+    ]:
+        condition = optimize(compile(query_str))
+        assert len(list(condition.expressions())) == count, query_str
+        validate_results(
+            expected=search(query_str, values, optimize=False),
+            actual=search(query_str, values)
+        )
@@ -0,0 +1,76 @@
+# parser_unittests.py
+from datetime import date, datetime
+from unittest import mock
+
+from search import Query
+from search.parsers.date import (
+    _parse_date,
+    _parse_datetime,
+    Date,
+    DateTime,
+)
+
+from . import run_unittest_and_verify_results
+from .. import unittest, TestObject
+
+
+@unittest
+def unittest_date_parser_formats():
+    '''Validate dates are parsed from every supported format'''
+    expected = date(2020, 1, 5)
+    for date_str in ('2020-01-05', '01-05-2020', '1-5-20', '01/05/2020',
+            '1/5/20', '01052020', '010520', '20200105', '2020/01/05',
+            '2020-1-5'):
+        assert Date(date_str) == expected, date_str
+
+    # Dates without a year default to the current year
+    this_year = datetime.now().year
+    for date_str in ('1/5', '01-05', '0105'):
+        assert Date(date_str) == date(this_year, 1, 5), date_str
+
+    # Cached dates without a year are not reused in a later year
+    for year in (2030, 2031):
+        assert _parse_date('1/5', year) == date(year, 1, 5)
+        assert _parse_datetime('1/5', year) == datetime(year, 1, 5)
+    assert _parse_date('2020-01-05', 2031) == expected
+
+    for date_str in ('', 'x', '2020-13-01', '13/05/2020', '1-5/2020'):
+        assert Date(date_str) is None, date_str
+
+
+@unittest
+def unittest_date_query_without_year():
+    '''Validate a cached query of a date without a year compares to the
+    date in the current year, after the year changes
+    '''
+    values = [{'d': date(2030, 1, 5)}, {'d': datetime(2031, 1, 5)}]
+    for year, expected in ((2030, values[0]), (2031, values[1])):
+        with mock.patch('search.parsers.current_year',
+                return_value=year):
+            results = Query('d = 1/5')(values)
+        assert results == [expected], f'{year}: {results}'
+
+
+@unittest
+def unittest_datetime_parser():
+    '''Validate datetimes are parsed without truncating the time'''
+    assert DateTime('2020-01-05T10:30:15') == datetime(2020, 1, 5, 10, 30, 15)
+    assert DateTime('2020-01-05T10') == datetime(2020, 1, 5, 10)
+    assert DateTime('01/05/2020') == datetime(2020, 1, 5)
+    assert DateTime('x') is None
+
+
+@unittest
+def unittest_datetime_comparison():
+    '''Validate datetime attributes are compared to the time'''
+    values = [
+        TestObject(when=datetime(2020, 1, 5, 9)),
+        TestObject(when=datetime(2020, 1, 5, 11)),
+        TestObject(when=datetime(2020, 1, 6)),
+        TestObject(when=date(2020, 1, 5)),
+    ]
+
+    run_unittest_and_verify_results(
+        'when > 2020-01-05T10:00:00', values, values[1:3])
+    run_unittest_and_verify_results('when > 01/05/2020', values, values[:3])
+    run_unittest_and_verify_results('when = 01/05/2020', values, values[3:])
@@ -1,4 +1,6 @@
 # property_unittests.py
+from search import invalidate_schema
+
 from . import run_unittest_and_verify_results
 from .. import unittest
 from ..testobject import PropertyTestObject
@@ -175,4 +177,63 @@ def unittest_properties_any():
     update_property_values(values)
     expected_results = values
     
-    run_unittest_and_verify_results(query_str, values, expected_results)
\ No newline at end of file
+    run_unittest_and_verify_results(query_str, values, expected_results)
+
+@unittest
+def unittest_properties_added_after_search():
+    '''Validate properties added to, replaced in, and removed from a class
+    after it was searched are found
+    '''
+    class Person(object):
+        def __init__(self, name):
+            self._name = name
+
+    values = [Person('mike'), Person('tom')]
+    run_unittest_and_verify_results('name = mike', values, [])
+
+    Person.name = property(lambda self: self._name)
+    run_unittest_and_verify_results('name = mike', values, values[:1])
+
+    del Person.name
+    run_unittest_and_verify_results('name = mike', values, [])
+
+    # Attributes replaced in place, without changing the number of
+    # attributes, by, or with, a property require invalidating the schema
+    Person.name = None
+    run_unittest_and_verify_results('name = mike', values, [])
+
+    Person.name = property(lambda self: self._name)
+    invalidate_schema(Person)
+    run_unittest_and_verify_results('name = mike', values, values[:1])
+
+    Person.name = property(lambda self: 'mike')
+    run_unittest_and_verify_results('name = mike', values, values)
+
+    Person.name = 'mike'
+    invalidate_schema(Person)
+    run_unittest_and_verify_results('name = mike', values, [])
+
+
+@unittest
+def unittest_properties_only_matching_evaluated():
+    '''Validate only properties whose name matches the field are evaluated'''
+    evaluated = []
+
+    class Person(object):
+        def __init__(self, name):
+            self._name = name
+
+        @property
+        def name(self):
+            evaluated.append('name')
+            return self._name
+
+        @property
+        def age(self):
+            evaluated.append('age')
+            raise AttributeError('age')
+
+    values = [Person('mike'), Person('tom')]
+    run_unittest_and_verify_results('name = mike', values, values[:1])
+
+    assert evaluated and set(evaluated) == {'name'}, evaluated
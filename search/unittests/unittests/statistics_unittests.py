@@ -0,0 +1,94 @@
+# statistics_unittests.py
+from search import clear_query_cache, Query
+from search.conditions import AndStatement, OrStatement
+from search.lexer import compile
+from search.query import compile_query
+
+from . import validate_results
+from .. import unittest, TestObject
+
+
+def _set_statistics(expression, cost, selectivity, evaluated=1000):
+    '''Sets the statistics of expression'''
+    statistics = expression.statistics
+    statistics.calls = 1
+    statistics.evaluated = evaluated
+    statistics.matched = int(evaluated * selectivity)
+    statistics.elapsed = cost * evaluated
+
+
+@unittest
+def unittest_statistics_order_conditions():
+    '''Validate AND evaluates cheap, selective conditions first and OR
+    evaluates cheap, unselective, conditions first
+    '''
+    a, b, c = [compile(f'{name} = 1') for name in 'abc']
+
+    statement = AndStatement(a, b, c)
+    assert statement.ordered_conditions() == [a, b, c]
+
+    _set_statistics(a, cost=1.0, selectivity=0.5)
+    _set_statistics(b, cost=1.0, selectivity=0.1)
+    assert statement.ordered_conditions() == [b, a, c]
+
+    _set_statistics(c, cost=0.1, selectivity=0.9)
+    assert statement.ordered_conditions() == [c, b, a]
+
+    statement = OrStatement(a, b, c)
+    assert statement.ordered_conditions() == [c, a, b]
+
+    # Nested statements are estimated from their conditions
+    and_cost, and_selectivity = AndStatement(a, b).estimate()
+    assert and_selectivity == 0.05 and and_cost == 1.1, (and_cost, and_selectivity)
+
+
+@unittest
+def unittest_statistics_collected():
+    '''Validate statistics are collected when the query is executed and
+    by sampling
+    '''
+    values = [TestObject(x=i, name='Mike' if i % 2 else 'Tom') for i in range(1, 11)]
+
+    clear_query_cache()
+    query = Query('x > 5 and name = Mike', optimize=False)
+    query.collect_statistics(values)
+    statistics = dict(query.statistics())
+    assert statistics['(x > 5)'].evaluated == 10, statistics['(x > 5)']
+    assert statistics['(x > 5)'].selectivity == 0.5
+    assert statistics['(name = Mike)'].selectivity == 0.5
+
+    validate_results(values[6::2], query(values))
+    assert statistics['(x > 5)'].calls + statistics['(name = Mike)'].calls == 4
+
+    assert '(x > 5): calls=' in query.explain(), query.explain()
+
+
+@unittest
+def unittest_statistics_order_does_not_change_results():
+    '''Validate the statistics collected do not change the results of a
+    query whose conditions may raise, e.g. comparing values of unordered
+    types, for every engine
+    '''
+    values = [{'a': 2, 'b': 1.5}, {'a': 1, 'b': 'c'}]
+    training = [{'a': 1, 'b': 'z'}] * 2000
+
+    # The tree engine collects the statistics of the cached condition, which
+    # every engine evaluates
+    for engine in ('tree', 'predicate', 'jit'):
+        clear_query_cache()
+        expected = Query('a = 1 and b < x', engine=engine)(values)
+        assert expected == [values[1]], expected
+
+        query = Query('a = 1 and b < x')
+        for _ in range(20):
+            query(training)
+        actual = Query('a = 1 and b < x', engine=engine)(values)
+        assert actual == expected, f'{engine}: {actual}'
+
+    # Conditions which can not raise are still ordered by their statistics
+    clear_query_cache()
+    query = Query('a = 1 and b = x')
+    for _ in range(20):
+        query(training)
+    ordered = compile_query('a = 1 and b = x').ordered_conditions()
+    assert [str(c) for c in ordered] == ['(b = x)', '(a = 1)'], ordered
@@ -1,7 +1,9 @@
 # utils.py
+import itertools
 import logging
 
 from search import search
+from search.query import EXECUTION_ENGINES, PARSER_ENGINES
 
 from .. import TestObject
 
@@ -87,8 +89,9 @@ def validate_results(expected, actual) -> None:
 
 def run_unittest_and_verify_results(query_str, values, expected_values) -> None:
     '''Runs a query using the provided query string and value collection, then
-    validates the results against the expected results collection.  An 
-    AssertionError is raised if the test fails
+    validates the results against the expected results collection.  The query
+    is run using every parser and execution engine, with and without
+    optimization.  An AssertionError is raised if the test fails
     
     Parameters:
     query_str - a string representing the query
@@ -96,7 +99,17 @@ def run_unittest_and_verify_results(query_str, values, expected_values) -> None:
     expected_values - a collection of expected values to validate against the
         results returned by *query*
     '''
-    validate_results(
-        expected=expected_values, 
-        actual=search(query_str, values)
-    )
\ No newline at end of file
+    for parser, engine, optimize in itertools.product(
+            PARSER_ENGINES, EXECUTION_ENGINES, (True, False)):
+        logger.debug(
+            f'parser: {parser}  engine: {engine}  optimize: {optimize}')
+        validate_results(
+            expected=expected_values, 
+            actual=search(
+                query_str,
+                values,
+                parser=parser,
+                engine=engine,
+                optimize=optimize
+            )
+        )
\ No newline at end of file
@@ -11,4 +11,7 @@ setup(
         'ply',
         'six',
     ],
+    extras_require={
+        'numpy': ['numpy>=1.17'],
+    },
 )
\ No newline at end of file